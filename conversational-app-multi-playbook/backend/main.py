@@ -21,16 +21,43 @@ the environment, defines root and version endpoints, includes API routers
 transcription using Google Cloud Speech-to-Text.
 """
 
-from fastapi import FastAPI, File, UploadFile
+from asyncio import create_task, to_thread
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from src.controller.chats import router as chat_router
 from src.controller.intents import router as intent_router
 from src.controller.models import router as model_router
+from src.service.chat_log import CHAT_LOG_WRITER
+from src.service.deployment_watcher import DEPLOYMENT_WATCHER
+from src.service.intent_matching import INTENT_EMBEDDINGS
+from src.service.intent_registry import INTENT_REGISTRY
+from src.service.vertex_ai import load_intent_indexes
+from src.utils.clients import CLIENTS, get_speech_client
+from src.utils.executor import CHAT_EXECUTOR
 from google.cloud import speech
 from os import getenv
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms the shared clients up, loads the intent registry and keeps it
+    and the intent deployments in sync while serving."""
+    INTENT_REGISTRY.add_listener(INTENT_EMBEDDINGS.get)
+    INTENT_REGISTRY.add_listener(load_intent_indexes)
+    await to_thread(CLIENTS.warm_up)
+    await to_thread(INTENT_REGISTRY.refresh)
+    intent_poller = create_task(INTENT_REGISTRY.poll())
+    deployment_watcher = create_task(DEPLOYMENT_WATCHER.poll())
+    yield
+    deployment_watcher.cancel()
+    intent_poller.cancel()
+    CHAT_EXECUTOR.shutdown()
+    await to_thread(CHAT_LOG_WRITER.close)
+    CLIENTS.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 def configure_cors(app):
@@ -75,8 +102,10 @@ def version():
 
 
 @app.post("/api/audio_chat")
-async def audio_chat(audio_file: UploadFile = File(...)):
-    client = speech.SpeechClient()
+async def audio_chat(
+    audio_file: UploadFile = File(...),
+    client: speech.SpeechClient = Depends(get_speech_client),
+):
     audio_content = await audio_file.read()
     audio = speech.RecognitionAudio(content=audio_content)
     config = speech.RecognitionConfig(
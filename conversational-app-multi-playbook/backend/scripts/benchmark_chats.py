@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load benchmark for the chat endpoint.
+
+Sends concurrent POST /api/chats requests to a running backend and reports
+throughput and latency percentiles. While the chats are in flight it also
+probes GET /api/version, which does no work: if the chat pipeline blocks
+the event loop, the probe latency grows to the duration of a chat.
+
+Run it against a single uvicorn worker before and after a change, e.g.:
+
+    uvicorn main:app --port 8080 --workers 1
+    python3 -m scripts.benchmark_chats --url http://localhost:8080 \\
+        --requests 50 --concurrency 10
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import List
+
+import requests
+
+DEFAULT_QUESTION = "What can you help me with?"
+
+
+def timed_post(url: str, question: str) -> float:
+    """Sends one chat request and returns its latency in seconds."""
+    started_at = perf_counter()
+    requests.post(f"{url}/api/chats", json={"text": question}, timeout=300)
+    return perf_counter() - started_at
+
+
+def probe(url: str, stop: Event, latencies: List[float]):
+    """Measures GET /api/version latency until `stop` is set."""
+    while not stop.is_set():
+        started_at = perf_counter()
+        requests.get(f"{url}/api/version", timeout=300)
+        latencies.append(perf_counter() - started_at)
+        sleep(0.1)
+
+
+def describe(name: str, latencies: List[float]):
+    """Prints the percentiles of a list of latencies."""
+    if len(latencies) < 2:
+        print(f"{name}: not enough samples")
+        return
+    cuts = quantiles(latencies, n=100)
+    print(
+        f"{name}: n={len(latencies)} p50={cuts[49] * 1000:.0f}ms "
+        f"p95={cuts[94] * 1000:.0f}ms max={max(latencies) * 1000:.0f}ms"
+    )
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    args = parser.parse_args()
+
+    stop = Event()
+    probe_latencies: List[float] = []
+    prober = Thread(target=probe, args=(args.url, stop, probe_latencies))
+    prober.start()
+
+    started_at = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        chat_latencies = list(
+            executor.map(
+                lambda _: timed_post(args.url, args.question),
+                range(args.requests),
+            )
+        )
+    elapsed = perf_counter() - started_at
+
+    stop.set()
+    prober.join()
+
+    print(
+        f"{args.requests} chats with concurrency {args.concurrency} "
+        f"in {elapsed:.1f}s: {args.requests / elapsed:.2f} req/s"
+    )
+    describe("POST /api/chats", chat_latencies)
+    describe("GET /api/version", probe_latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-request overhead of the Google Cloud clients.
+
+Simulates the client work of a request in two ways: "fresh" creates new
+clients every time, as the services did before the ClientProvider, and
+"shared" takes them from the provider. Each simulated request makes one
+cheap call per client, so connection setup, TLS and token fetches are
+part of the measurement. It needs application default credentials:
+
+    python3 -m scripts.benchmark_clients --requests 20
+"""
+
+from argparse import ArgumentParser
+from statistics import quantiles
+from time import perf_counter
+from typing import Callable, List
+
+from google.cloud import bigquery, storage
+from google.cloud.tasks_v2 import CloudTasksClient
+from src.repository.task import LOCATION
+from src.utils.clients import CLIENTS
+
+
+def use_clients(
+    bigquery_client: bigquery.Client,
+    storage_client: storage.Client,
+    tasks_client: CloudTasksClient,
+    project_id: str,
+):
+    """Makes one cheap authenticated call with each client."""
+    list(bigquery_client.list_datasets(max_results=1))
+    list(storage_client.list_buckets(max_results=1))
+    list(
+        tasks_client.list_queues(
+            request={
+                "parent": f"projects/{project_id}/locations/{LOCATION}",
+                "page_size": 1,
+            }
+        )
+    )
+
+
+def fresh_request(project_id: str):
+    """A request creating its own clients."""
+    use_clients(
+        bigquery.Client(), storage.Client(), CloudTasksClient(), project_id
+    )
+
+
+def shared_request(project_id: str):
+    """A request using the application scoped clients."""
+    use_clients(
+        CLIENTS.bigquery(), CLIENTS.storage(), CLIENTS.tasks(), project_id
+    )
+
+
+def measure(request: Callable[[str], None], count: int, project_id: str):
+    """Runs `count` simulated requests and returns their latencies."""
+    latencies: List[float] = []
+    for _ in range(count):
+        started_at = perf_counter()
+        request(project_id)
+        latencies.append(perf_counter() - started_at)
+    return latencies
+
+
+def describe(name: str, latencies: List[float]):
+    """Prints the percentiles of a list of latencies."""
+    if len(latencies) < 2:
+        print(f"{name}: not enough samples")
+        return
+    cuts = quantiles(latencies, n=100)
+    print(
+        f"{name}: n={len(latencies)} p50={cuts[49] * 1000:.0f}ms "
+        f"p95={cuts[94] * 1000:.0f}ms max={max(latencies) * 1000:.0f}ms"
+    )
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    project_id = CLIENTS.project_id()
+    started_at = perf_counter()
+    CLIENTS.warm_up()
+    print(f"Warm up: {(perf_counter() - started_at) * 1000:.0f}ms")
+
+    describe("fresh", measure(fresh_request, args.requests, project_id))
+    describe("shared", measure(shared_request, args.requests, project_id))
+    CLIENTS.close()
+
+
+if __name__ == "__main__":
+    main()
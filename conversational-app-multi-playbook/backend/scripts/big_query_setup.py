@@ -14,8 +14,14 @@
 
 """Utility functions for setting up Google BigQuery datasets and tables."""
 
-from typing import List
-from google.cloud.bigquery import Client as BigQueryClient, Table, SchemaField
+from typing import List, Optional
+from google.cloud.bigquery import (
+    Client as BigQueryClient,
+    SchemaField,
+    Table,
+    TimePartitioning,
+    TimePartitioningType,
+)
 
 bigquery_client = BigQueryClient()
 PROJECT_ID = bigquery_client.project
@@ -38,17 +44,32 @@ def create_dataset(dataset_name: str):
     bigquery_client.create_dataset(dataset_name)
 
 
-def create_table(dataset: str, table_name: str, schema: List[SchemaField]):
+def create_table(
+    dataset: str,
+    table_name: str,
+    schema: List[SchemaField],
+    partition_column: Optional[str] = None,
+    clustering_columns: Optional[List[str]] = None,
+):
     """Creates a BigQuery table within a specified dataset.
 
     Args:
         dataset: The name of the dataset where the table will be created.
         table_name: The name for the new BigQuery table.
         schema: A list of SchemaField objects defining the table's structure.
+        partition_column: A TIMESTAMP or DATE column to partition the table
+                          by day on, if any.
+        clustering_columns: Up to four columns to cluster the table by, if
+                            any.
     """
-    bigquery_client.create_table(
-        Table(f"{PROJECT_ID}.{dataset}.{table_name}", schema)
-    )
+    table = Table(f"{PROJECT_ID}.{dataset}.{table_name}", schema)
+    if partition_column:
+        table.time_partitioning = TimePartitioning(
+            type_=TimePartitioningType.DAY, field=partition_column
+        )
+    if clustering_columns:
+        table.clustering_fields = clustering_columns
+    bigquery_client.create_table(table)
 
 
 def insert_intent(dataset: str, table_name: str, values: str):
@@ -64,8 +85,6 @@ def insert_intent(dataset: str, table_name: str, values: str):
                 The caller is responsible for correct formatting, quoting, and
                 ensuring the order matches the table schema.
     """
-    bigquery_client.query(
-        f"""
+    bigquery_client.query(f"""
                 INSERT INTO `{dataset}.{table_name}` VALUES({values});
-            """
-    ).result()
+            """).result()
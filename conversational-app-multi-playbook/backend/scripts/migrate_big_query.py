@@ -0,0 +1,142 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Migrates an existing BigQuery dataset to the current table layouts.
+
+Datasets created by older versions of setup.py have plain, unpartitioned
+chats and embeddings tables, and an intents table without the
+vector_search_backend column. This script:
+
+1. Adds the missing intents columns in place.
+2. Rebuilds the chats table partitioned by day on timestamp and clustered
+   by intent, and the embeddings table clustered by index and id. The
+   partitioning of a table can't be changed in place, so each table is
+   copied into its new layout with CREATE TABLE ... AS SELECT, then the
+   old table is dropped and the copy renamed.
+
+Tables already in their layout are skipped, so the script can be run
+again safely. Rows written between the copy and the drop are lost: stop
+the backend and the create-intent function while it runs.
+
+It prints the statements without running them unless --execute is set:
+
+    python3 -m scripts.migrate_big_query --dataset quick_bot_app --execute
+"""
+
+from argparse import ArgumentParser
+from os import getenv
+from typing import List, Optional
+from google.api_core.exceptions import NotFound
+from scripts.big_query_setup import bigquery_client
+from src.repository.big_query import (
+    CHATS_CLUSTERING_COLUMNS,
+    CHATS_PARTITION_COLUMN,
+    CHATS_TABLE,
+    EMBEDDINGS_CLUSTERING_COLUMNS,
+    EMBEDDINGS_TABLE,
+)
+from src.service.intent import INTENTS_TABLE
+
+MIGRATION_SUFFIX = "_migration"
+
+# Columns added to the intents table after its first release.
+INTENTS_ADDED_COLUMNS = {"vector_search_backend": "STRING"}
+
+
+def add_intents_columns(dataset: str) -> List[str]:
+    """Returns the statements adding the missing intents columns."""
+    return [
+        f"ALTER TABLE `{dataset}.{INTENTS_TABLE}` "
+        f"ADD COLUMN IF NOT EXISTS {column} {column_type}"
+        for column, column_type in INTENTS_ADDED_COLUMNS.items()
+    ]
+
+
+def relayout_table(
+    dataset: str,
+    table_name: str,
+    partition_column: Optional[str],
+    clustering_columns: List[str],
+) -> List[str]:
+    """Returns the statements moving a table to a new layout.
+
+    Returns no statements if the table is missing or already has the
+    layout.
+    """
+    try:
+        table = bigquery_client.get_table(f"{dataset}.{table_name}")
+    except NotFound:
+        print(f"{dataset}.{table_name} doesn't exist, skipping")
+        return []
+
+    partitioned_by = (
+        table.time_partitioning.field if table.time_partitioning else None
+    )
+    if (
+        partitioned_by == partition_column
+        and (table.clustering_fields or []) == clustering_columns
+    ):
+        print(f"{dataset}.{table_name} already has its layout, skipping")
+        return []
+
+    partition_by = (
+        f"PARTITION BY TIMESTAMP_TRUNC(`{partition_column}`, DAY) "
+        if partition_column
+        else ""
+    )
+    cluster_by = ", ".join(f"`{column}`" for column in clustering_columns)
+    copy_name = f"{table_name}{MIGRATION_SUFFIX}"
+    return [
+        f"CREATE OR REPLACE TABLE `{dataset}.{copy_name}` "
+        f"{partition_by}CLUSTER BY {cluster_by} "
+        f"AS SELECT * FROM `{dataset}.{table_name}`",
+        f"DROP TABLE `{dataset}.{table_name}`",
+        f"ALTER TABLE `{dataset}.{copy_name}` RENAME TO `{table_name}`",
+    ]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default=getenv("BIG_QUERY_DATASET"))
+    parser.add_argument("--execute", action="store_true")
+    args = parser.parse_args()
+    if not args.dataset:
+        parser.error("--dataset or BIG_QUERY_DATASET is required")
+
+    statements = [
+        *add_intents_columns(args.dataset),
+        *relayout_table(
+            args.dataset,
+            CHATS_TABLE,
+            CHATS_PARTITION_COLUMN,
+            CHATS_CLUSTERING_COLUMNS,
+        ),
+        *relayout_table(
+            args.dataset,
+            EMBEDDINGS_TABLE,
+            None,
+            EMBEDDINGS_CLUSTERING_COLUMNS,
+        ),
+    ]
+    for statement in statements:
+        print(f"{statement};")
+        if args.execute:
+            bigquery_client.query(statement).result()
+
+    if not args.execute:
+        print("\nDry run, pass --execute to run the statements above.")
+
+
+if __name__ == "__main__":
+    main()
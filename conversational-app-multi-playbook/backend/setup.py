@@ -19,7 +19,9 @@ It performs the following actions:
 1. Creates a Google Cloud Storage (GCS) bucket if it doesn't exist.
 2. Creates a BigQuery dataset if it doesn't exist.
 3. Creates the necessary BigQuery tables (Chats, Embeddings, Intents) within 
-the dataset, using schemas defined in the corresponding model classes.
+the dataset, using schemas defined in the corresponding model classes. Chats
+are partitioned by day and clustered by intent, embeddings are clustered by
+index and id. Existing datasets are migrated with scripts/migrate_big_query.py.
 
 Note: Ensure that the required environment variables 
 (like GOOGLE_APPLICATION_CREDENTIALS) and configurations (like BUCKET
@@ -31,7 +33,13 @@ from scripts.gcs_setup import create_bucket, BUCKET
 from src.model.chats import Chat
 from src.model.embedding import Embedding
 from src.model.intent import Intent
-from src.repository.big_query import CHATS_TABLE, EMBEDDINGS_TABLE
+from src.repository.big_query import (
+    CHATS_CLUSTERING_COLUMNS,
+    CHATS_PARTITION_COLUMN,
+    CHATS_TABLE,
+    EMBEDDINGS_CLUSTERING_COLUMNS,
+    EMBEDDINGS_TABLE,
+)
 from src.service.intent import INTENTS_TABLE
 
 BIG_QUERY_DATASET = ""
@@ -72,8 +80,19 @@ print("\nSuccess!\n")
 print("Setting up BigQuery... \n")
 
 create_dataset(BIG_QUERY_DATASET)
-create_table(BIG_QUERY_DATASET, CHATS_TABLE, Chat.__schema__())
-create_table(BIG_QUERY_DATASET, EMBEDDINGS_TABLE, Embedding.__schema__())
+create_table(
+    BIG_QUERY_DATASET,
+    CHATS_TABLE,
+    Chat.__schema__(),
+    partition_column=CHATS_PARTITION_COLUMN,
+    clustering_columns=CHATS_CLUSTERING_COLUMNS,
+)
+create_table(
+    BIG_QUERY_DATASET,
+    EMBEDDINGS_TABLE,
+    Embedding.__schema__(),
+    clustering_columns=EMBEDDINGS_CLUSTERING_COLUMNS,
+)
 create_table(BIG_QUERY_DATASET, INTENTS_TABLE, Intent.__schema__())
 
 for intent in DEFAULT_INTENTS:
@@ -12,13 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from json import dumps
+from typing import Iterator, Tuple
 from uuid import uuid4
-from fastapi import APIRouter, BackgroundTasks, Response
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from src.model.chats import CreateChatRequest, Chat
-from src.service.intent import IntentService
-from src.service.intent_matching import IntentMatchingService
+from src.service.intent_registry import INTENT_REGISTRY
+from src.service.intent_matching import IntentMatch, IntentMatchingService
+from src.service.response_cache import RESPONSE_CACHE
+from src.repository.big_query import QUERY_STATS
+from src.service.chat_log import CHAT_LOG_WRITER
 from src.service.chats import ChatsService
-from src.service.vertex_ai import VertexAIService
+from src.service.vertex_ai import (
+    CHUNK_TEXT_CACHE,
+    NEIGHBORS_CACHE,
+    QUERY_EMBEDDINGS,
+    VertexAIService,
+)
+from src.utils.executor import CHAT_EXECUTOR
 
 router = APIRouter(
     prefix="/api/chats",
@@ -26,6 +39,70 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+NO_CACHE_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+
+def to_server_sent_event(event: str, data: dict) -> str:
+    """Formats a single Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def classify(text: str) -> IntentMatch:
+    """Finds the intent of a question.
+
+    Raises:
+        HTTPException: 404 if there are no intents or none is similar to
+                       the question.
+    """
+    intents = INTENT_REGISTRY.get_all()
+    intent_match = IntentMatchingService(intents).classify(text)
+    if intent_match.intent is None:
+        raise HTTPException(
+            status_code=404, detail="No intent matches the question"
+        )
+    return intent_match
+
+
+def answer_chat(text: str) -> Chat:
+    """Runs the blocking classification and generation pipeline."""
+    with QUERY_EMBEDDINGS.request_scope():
+        intent_match = classify(text)
+        intent = intent_match.intent
+
+        model_response = VertexAIService().generate_text_from_model(
+            text,
+            intent,
+            intent_match.query_embedding,
+        )
+
+    return Chat(
+        id=str(uuid4()),
+        question=text,
+        answer=model_response,
+        intent=intent.name,
+        suggested_questions=intent_match.suggested_questions,
+    )
+
+
+def start_chat_stream(text: str) -> Tuple[IntentMatch, Iterator[str]]:
+    """Runs the blocking classification and retrieval steps of a stream."""
+    with QUERY_EMBEDDINGS.request_scope():
+        intent_match = classify(text)
+        model_response = VertexAIService().stream_text_from_model(
+            text,
+            intent_match.intent,
+            intent_match.query_embedding,
+        )
+    return intent_match, model_response
+
+
+def insert_chat(chat: Chat):
+    ChatsService().insert_chat(chat)
+
 
 @router.post("")
 async def chat(
@@ -33,33 +110,79 @@ async def chat(
     response: Response,
     background_tasks: BackgroundTasks,
 ):
-    intents = IntentService().get_all()
-    intent_matching_service = IntentMatchingService(intents)
+    final_response = await CHAT_EXECUTOR.run(answer_chat, item.text)
 
-    intent = intent_matching_service.get_intent_from_query(item.text)
-    suggestedQuestion = intent_matching_service.get_suggested_questions(
-        item.text, intent
-    )
+    background_tasks.add_task(insert_chat, final_response)
 
-    model_response = VertexAIService(intents).generate_text_from_model(
-        item.text,
-        intent,
-    )
+    response.headers.update(NO_CACHE_HEADERS)
+    return final_response
 
-    final_response = Chat(
-        id=str(uuid4()),
-        question=item.text,
-        answer=model_response,
-        intent=intent.name,
-        suggested_questions=suggestedQuestion,
+
+@router.post("/stream")
+async def chat_stream(item: CreateChatRequest):
+    """Streams the model answer as Server-Sent Events.
+
+    Every part produced by the model is sent as an `answer` event as soon as
+    it arrives. A trailing `end` event carries the chat id, the inferred
+    intent and the suggested questions. The chat is persisted once the
+    stream has been fully sent.
+    """
+    intent_match, model_response = await CHAT_EXECUTOR.run(
+        start_chat_stream, item.text
     )
+    intent = intent_match.intent
+    chat_id = str(uuid4())
+    answer_parts = []
+
+    async def event_stream():
+        # Each chunk is pulled on the executor, as the Gemini stream blocks
+        # while waiting for the next part.
+        while True:
+            part = await CHAT_EXECUTOR.run(next, model_response, None)
+            if part is None:
+                break
+            answer_parts.append(part)
+            yield to_server_sent_event("answer", {"answer": part})
+        yield to_server_sent_event(
+            "end",
+            {
+                "id": chat_id,
+                "intent": intent.name,
+                "suggested_questions": intent_match.suggested_questions,
+            },
+        )
 
-    background_tasks.add_task(
-        ChatsService().insert_chat,
-        final_response,
+    def insert_streamed_chat():
+        insert_chat(
+            Chat(
+                id=chat_id,
+                question=item.text,
+                answer="".join(answer_parts),
+                intent=intent.name,
+                suggested_questions=intent_match.suggested_questions,
+            )
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={**NO_CACHE_HEADERS, "X-Accel-Buffering": "no"},
+        background=BackgroundTask(insert_streamed_chat),
     )
 
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return final_response
+
+@router.get("/metrics")
+async def get_metrics():
+    """Returns the counters of the chat pipeline executor, chat log
+    writer, BigQuery queries and caches."""
+    return {
+        "executor": CHAT_EXECUTOR.stats(),
+        "chat_log": CHAT_LOG_WRITER.stats(),
+        "big_query": QUERY_STATS.stats(),
+        "caches": {
+            "chunk_texts": CHUNK_TEXT_CACHE.stats(),
+            "neighbors": NEIGHBORS_CACHE.stats(),
+            "responses": RESPONSE_CACHE.stats(),
+            "query_embeddings": QUERY_EMBEDDINGS.stats(),
+        },
+    }
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 from fastapi import APIRouter, HTTPException
 from src.model.http_status import BadRequest
 from src.model.intent import CreateIntentRequest, Intent
@@ -19,6 +20,7 @@ from src.model.event import IntentCreateEvent
 from src.repository.task import TaskRepository
 from src.service.index_endpoint import IndexEndpointService
 from src.service.intent import IntentService
+from src.service.intent_registry import INTENT_REGISTRY
 
 router = APIRouter(
     prefix="/api/intents",
@@ -29,19 +31,8 @@ router = APIRouter(
 
 @router.get("")
 async def get_intents():
-    service = IntentService()
-    intents = service.get_all()
-
-    for intent in intents:
-        if not intent.is_active():
-            index_endpoint_service = IndexEndpointService()
-            if index_endpoint_service.endpoint_has_deployed_indexes(
-                intent.get_standard_name()
-            ):
-                intent.status = "5"
-                service.update(intent.name, intent)
-
-    return intents
+    # Pending deployments are reconciled by the DeploymentWatcher.
+    return INTENT_REGISTRY.get_all()
 
 
 @router.post("")
@@ -54,14 +45,17 @@ async def create_intent(intent: CreateIntentRequest):
     index_endpoint = None
     try:
         saved_intent = intent_service.create(intent.to_intent())
-        if intent.gcp_bucket:
+        if saved_intent.uses_matching_engine():
             index_endpoint = index_endpoint_service.create_endpoint(
                 saved_intent.get_standard_name()
             )
+        if intent.gcp_bucket:
             task_repository.create(
                 IntentCreateEvent(
                     intent_name=intent.name,
-                    index_endpoint_resource=index_endpoint.resource_name,
+                    index_endpoint_resource=(
+                        index_endpoint.resource_name if index_endpoint else ""
+                    ),
                 ),
             )
     except BadRequest as e:
@@ -73,6 +67,7 @@ async def create_intent(intent: CreateIntentRequest):
         if index_endpoint:
             index_endpoint_service.delete_endpoint(index_endpoint)
 
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
     return saved_intent
 
 
@@ -80,17 +75,46 @@ async def create_intent(intent: CreateIntentRequest):
 async def delete_intent(intent_name: str):
     service = IntentService()
     intent = service.get(intent_name)
-    if intent.gcp_bucket:
+    if intent.uses_matching_engine():
         index_endpoint_service = IndexEndpointService()
         endpoint = index_endpoint_service.get_endpoint(
             intent.get_standard_name()
         )
         index_endpoint_service.delete_endpoint(endpoint)
     service.delete(intent_name)
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
+    return
+
+
+@router.post("/{intent_name}/reindex")
+async def reindex_intent(intent_name: str):
+    intent = INTENT_REGISTRY.get(intent_name)
+    if not intent:
+        raise HTTPException(status_code=404, detail="Intent not found")
+    if not intent.gcp_bucket:
+        raise HTTPException(
+            status_code=400, detail="Intent has no GCP bucket to index"
+        )
+
+    index_endpoint_resource = ""
+    if intent.uses_matching_engine():
+        index_endpoint_resource = (
+            IndexEndpointService()
+            .get_endpoint(intent.get_standard_name())
+            .resource_name
+        )
+    TaskRepository().create(
+        IntentCreateEvent(
+            intent_name=intent.name,
+            index_endpoint_resource=index_endpoint_resource,
+            mode="incremental",
+        ),
+    )
     return
 
 
 @router.put("/{intent_name}")
 async def update_intent(intent_name: str, intent: Intent):
     service = IntentService()
-    return service.update(intent_name, intent)
+    service.update(intent_name, intent)
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime, timezone
 from google.cloud.bigquery import SchemaField
 from pydantic import BaseModel
 from typing import List, Optional
@@ -42,5 +43,18 @@ class Embedding(BaseModel):
             "timestamp": self.timestamp,
         }
 
+    def to_row(self):
+        return {
+            "id": self.id,
+            "text": self.text,
+            "index": self.index,
+            "author": self.author,
+            "timestamp": (
+                datetime.fromisoformat(self.timestamp)
+                if self.timestamp
+                else datetime.now(timezone.utc)
+            ),
+        }
+
     def to_insert_string(self):
         return f'"{self.id}", """{self.text}""", "{self.index}", "{self.author}", CURRENT_TIMESTAMP()'
@@ -32,11 +32,16 @@ class IntentCreateEvent(BaseModel):
         intent_name: The unique name of the intent being processed.
         index_endpoint_resource: The full resource name of the Vertex AI
                                  Matching Engine Index Endpoint associated
-                                 with this intent.
+                                 with this intent. Empty for intents
+                                 searched in process by the backend.
+        mode: "full" to build a new index from every document of the intent
+              bucket, or "incremental" to apply only the documents that
+              changed since the last build to the existing index.
     """
 
     intent_name: str
     index_endpoint_resource: str
+    mode: str = "full"
 
     def to_dict(self):
         """Serializes the event data into a dictionary format.
@@ -51,4 +56,5 @@ class IntentCreateEvent(BaseModel):
         return {
             "intent_name": self.intent_name,
             "index_endpoint_resource": self.index_endpoint_resource,
+            "mode": self.mode,
         }
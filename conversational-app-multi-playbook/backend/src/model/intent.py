@@ -12,9 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from decimal import Decimal
 from google.cloud.bigquery import SchemaField
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
+
+MATCHING_ENGINE_BACKEND = "matching_engine"
+LOCAL_BACKEND = "local"
+
+VectorSearchBackend = Literal["matching_engine", "local"]
 
 
 class Intent(BaseModel):
@@ -26,6 +32,7 @@ class Intent(BaseModel):
     questions: List[str]
     status: str
     gcp_bucket: str = ""
+    vector_search_backend: Optional[VectorSearchBackend] = None
 
     def __schema__() -> List[SchemaField]:
         return [
@@ -37,6 +44,7 @@ class Intent(BaseModel):
             SchemaField("questions", "STRING", mode="REPEATED"),
             SchemaField("status", "STRING", mode="REQUIRED"),
             SchemaField("gcp_bucket", "STRING", mode="REQUIRED"),
+            SchemaField("vector_search_backend", "STRING", mode="NULLABLE"),
         ]
 
     def __from_row__(row):
@@ -49,6 +57,8 @@ class Intent(BaseModel):
             questions=row[5],
             status=row[6],
             gcp_bucket=row[7],
+            # Tables created before the column was added don't have it.
+            vector_search_backend=row.get("vector_search_backend"),
         )
 
     def to_dict(self):
@@ -60,10 +70,25 @@ class Intent(BaseModel):
             "questions": self.questions,
             "status": self.status,
             "gcp_bucket": self.gcp_bucket,
+            "vector_search_backend": self.vector_search_backend,
+        }
+
+    def to_row(self):
+        return {
+            "name": self.name,
+            "ai_model": self.ai_model,
+            # NUMERIC column, a float would be rounded to binary.
+            "ai_temperature": Decimal(str(self.ai_temperature)),
+            "description": self.description,
+            "prompt": self.prompt,
+            "questions": self.questions,
+            "status": self.status,
+            "gcp_bucket": self.gcp_bucket,
+            "vector_search_backend": self.get_vector_search_backend(),
         }
 
     def to_insert_string(self):
-        return f'"{self.name}", "{self.ai_model}", {self.ai_temperature},"{self.description}","""{self.prompt}""", {str(self.questions)}, "{self.status}", "{self.gcp_bucket}"'
+        return f'"{self.name}", "{self.ai_model}", {self.ai_temperature},"{self.description}","""{self.prompt}""", {str(self.questions)}, "{self.status}", "{self.gcp_bucket}", "{self.get_vector_search_backend()}"'
 
     def is_active(self) -> bool:
         return self.status == "5"
@@ -71,6 +96,14 @@ class Intent(BaseModel):
     def get_standard_name(self) -> str:
         return self.name.lower().replace(" ", "-").replace("_", "-")
 
+    def get_vector_search_backend(self) -> str:
+        return self.vector_search_backend or MATCHING_ENGINE_BACKEND
+
+    def uses_matching_engine(self) -> bool:
+        return bool(self.gcp_bucket) and (
+            self.get_vector_search_backend() == MATCHING_ENGINE_BACKEND
+        )
+
 
 class CreateIntentRequest(BaseModel):
     name: str
@@ -80,6 +113,7 @@ class CreateIntentRequest(BaseModel):
     description: str
     prompt: str
     questions: List[str]
+    vector_search_backend: VectorSearchBackend = MATCHING_ENGINE_BACKEND
 
     def to_dict(self):
         return {
@@ -90,6 +124,7 @@ class CreateIntentRequest(BaseModel):
             "description": self.description,
             "prompt": self.prompt,
             "questions": self.questions,
+            "vector_search_backend": self.vector_search_backend,
         }
 
     def to_intent(self) -> Intent:
@@ -102,4 +137,5 @@ class CreateIntentRequest(BaseModel):
             questions=self.questions,
             status="1",
             gcp_bucket=self.gcp_bucket,
+            vector_search_backend=self.vector_search_backend,
         )
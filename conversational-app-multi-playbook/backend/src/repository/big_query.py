@@ -19,27 +19,142 @@ application and includes the BigQueryRepository class, which encapsulates
 common database operations (CRUD) for BigQuery tables.
 
 Note:
-    Several methods in BigQueryRepository construct SQL queries using f-strings.
-    While convenient, this approach can be vulnerable to SQL injection if input
-    values (like IDs or column values) are not properly sanitized or originate
-    from untrusted sources. Consider using parameterized queries or the
-    BigQuery client library's dedicated methods (e.g., `insert_rows_json`)
-    for enhanced security, especially when dealing with user-provided data.
+    Values are always sent as query parameters, never formatted into the SQL
+    text. This avoids escaping issues and SQL injection, and keeps the text
+    of a statement identical across calls, so BigQuery can serve repeated
+    reads from its query result cache. Only table and column names, which
+    are constants of the application, are part of the SQL text.
 """
 
+from datetime import date, datetime
+from decimal import Decimal
 from os import getenv
-from typing import Dict, List
-from google.cloud.bigquery import Client
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Union
+from google.cloud.bigquery import (
+    ArrayQueryParameter,
+    Client,
+    QueryJob,
+    QueryJobConfig,
+    ScalarQueryParameter,
+    StructQueryParameter,
+)
+from src.utils.clients import CLIENTS
 
 BIG_QUERY_DATASET = getenv("BIG_QUERY_DATASET")
 
 CHATS_TABLE = "chats"
 CHATS_ID_COLUMN = "id"
+# Chats are partitioned by day and clustered by intent, so analytics on a
+# time range or an intent only scan the matching blocks.
+CHATS_PARTITION_COLUMN = "timestamp"
+CHATS_CLUSTERING_COLUMNS = ["intent"]
 
 EMBEDDINGS_TABLE = "embeddings"
 EMBEDDINGS_ID_COLUMN = "id"
 EMBEDDINGS_TEXT_COLUMN = "text"
 EMBEDDINGS_INDEX_COLUMN = "index"
+# Chunk text lookups filter by index and id, so clustering by them prunes
+# the blocks of every other intent instead of scanning the whole table.
+EMBEDDINGS_CLUSTERING_COLUMNS = [EMBEDDINGS_INDEX_COLUMN, EMBEDDINGS_ID_COLUMN]
+
+QueryParameter = Union[
+    ArrayQueryParameter, ScalarQueryParameter, StructQueryParameter
+]
+
+
+def scalar_type(value: Any) -> str:
+    """Returns the BigQuery type of a Python value.
+
+    None maps to STRING, which BigQuery coerces to NULL of any type.
+    Decimal maps to NUMERIC, so NUMERIC columns keep their exact value.
+    """
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, Decimal):
+        return "NUMERIC"
+    if isinstance(value, datetime):
+        return "TIMESTAMP"
+    if isinstance(value, date):
+        return "DATE"
+    if isinstance(value, bytes):
+        return "BYTES"
+    return "STRING"
+
+
+def query_parameter(name: Optional[str], value: Any) -> QueryParameter:
+    """Builds a named query parameter, inferring its type from the value.
+
+    Args:
+        name: The name the parameter is referenced by (`@name`), or None
+              for the fields of an array of structs.
+        value: A scalar, a list of scalars, or a dictionary for a struct.
+
+    Returns:
+        A scalar, array or struct query parameter.
+    """
+    if isinstance(value, dict):
+        return StructQueryParameter(
+            name, *[query_parameter(k, v) for k, v in value.items()]
+        )
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], dict):
+            return ArrayQueryParameter(
+                name,
+                "STRUCT",
+                [query_parameter(None, item) for item in value],
+            )
+        element_type = scalar_type(value[0]) if value else "STRING"
+        return ArrayQueryParameter(name, element_type, list(value))
+    return ScalarQueryParameter(name, scalar_type(value), value)
+
+
+def projection(columns: Optional[List[str]]) -> str:
+    """Returns the SELECT list of the given columns, or * if None."""
+    if not columns:
+        return "*"
+    return ", ".join(f"`{column}`" for column in columns)
+
+
+class QueryStats:
+    """Thread-safe counters of the bytes billed and cache hits per label."""
+
+    def __init__(self):
+        """Initializes empty counters."""
+        self._lock = Lock()
+        self._labels: Dict[str, Dict[str, int]] = {}
+
+    def record(self, label: str, job: QueryJob):
+        """Adds the statistics of a finished query job."""
+        with self._lock:
+            counters = self._labels.setdefault(
+                label, {"queries": 0, "bytes_billed": 0, "cache_hits": 0}
+            )
+            counters["queries"] += 1
+            counters["bytes_billed"] += job.total_bytes_billed or 0
+            counters["cache_hits"] += 1 if job.cache_hit else 0
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns a snapshot of the counters of every label."""
+        with self._lock:
+            return {
+                label: {
+                    **counters,
+                    "cache_hit_ratio": counters["cache_hits"]
+                    / counters["queries"],
+                }
+                for label, counters in self._labels.items()
+            }
+
+
+QUERY_STATS = QueryStats()
+
+# Column names of the tables, read once per process.
+TABLE_COLUMNS: Dict[str, List[str]] = {}
 
 
 class BigQueryRepository:
@@ -51,17 +166,27 @@ class BigQueryRepository:
     """
 
     def __init__(self):
-        """Initializes the BigQuery client."""
-        self.client: Client = Client()
+        """Initializes the repository with the shared BigQuery client."""
+        self.client: Client = CLIENTS.bigquery()
 
-    def run_query(self, query: str):
+    def run_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        label: str = "query",
+    ):
         """
-        Executes a BigQuery SQL query and returns the results.
+        Executes a parameterized BigQuery SQL query and returns the results.
+
+        The query result cache is enabled, and the bytes billed and cache
+        hit of the job are added to QUERY_STATS under `label`.
 
         Args:
-            query: The SQL query string to execute.
-            **query_params: Optional parameters for parameterized queries
-                           (recommended for security).
+            query: The SQL query string to execute. Values are referenced
+                   as `@name` parameters.
+            params: The values of the parameters, by name. Their types are
+                    inferred with `query_parameter`.
+            label: The name statistics are reported under.
 
         Returns:
             A RowIterator object to iterate over the query results.
@@ -69,9 +194,40 @@ class BigQueryRepository:
         Raises:
             google.cloud.exceptions.GoogleCloudError: If the query fails.
         """
-        return self.client.query(query).result()
+        job_config = QueryJobConfig(
+            query_parameters=[
+                query_parameter(name, value)
+                for name, value in (params or {}).items()
+            ],
+            use_query_cache=True,
+        )
+        job = self.client.query(query, job_config=job_config)
+        results = job.result()
+        QUERY_STATS.record(label, job)
+        return results
 
-    def get_row_by_id(self, table_id: str, id_column: str, id_value: str):
+    def get_table_columns(self, table_id: str) -> List[str]:
+        """
+        Returns the column names of a table, read once per process.
+
+        Args:
+            table_id: The ID of the table.
+
+        Returns:
+            The names of the top level columns, in schema order.
+        """
+        if table_id not in TABLE_COLUMNS:
+            table = self.client.get_table(f"{BIG_QUERY_DATASET}.{table_id}")
+            TABLE_COLUMNS[table_id] = [field.name for field in table.schema]
+        return TABLE_COLUMNS[table_id]
+
+    def get_row_by_id(
+        self,
+        table_id: str,
+        id_column: str,
+        id_value: str,
+        columns: Optional[List[str]] = None,
+    ):
         """
         Retrieves a single row from a table based on its ID.
 
@@ -79,36 +235,106 @@ class BigQueryRepository:
             table_id: The ID of the table (without dataset prefix).
             id_column: The name of the column containing the ID.
             id_value: The specific ID value to search for.
+            columns: The columns to read, in order. BigQuery bills by the
+                     columns read, so callers should only ask for the ones
+                     they use. Defaults to every column.
 
         Returns:
             A RowIterator containing the matching row(s) (usually one).
         """
         query = f"""
-                SELECT * FROM `{BIG_QUERY_DATASET}.{table_id}`
-                 WHERE {id_column} = "{id_value}";
+                SELECT {projection(columns)} FROM `{BIG_QUERY_DATASET}.{table_id}`
+                 WHERE {id_column} = @id;
             """
-        return self.run_query(query)
+        return self.run_query(
+            query, {"id": id_value}, label=f"{table_id}.get_row_by_id"
+        )
 
-    def insert_row(self, table_id: str, values: str):
+    def insert_row(self, table_id: str, row: Dict[str, Any]):
         """
-        Inserts a new row into the specified table.
+        Inserts a new row into the specified table with a DML statement.
+
+        Rows inserted with DML can be updated and deleted right away, unlike
+        rows streamed with insert_rows_json.
 
         Args:
             table_id: The ID of the table.
-            values: A string representing the values to insert, formatted
-                    correctly for the SQL VALUES clause
-                    (e.g., "'val1', 123, TRUE"). Consider using
-                    parameterization or the insert_rows_json method
-                    for safer and more structured inserts.
+            row: The values of the new row, by column name. Columns left
+                 out take their default value.
 
         Returns:
             The result of the query execution (often None for INSERT).
         """
+        columns = list(row)
         query = f"""
                 INSERT INTO `{BIG_QUERY_DATASET}.{table_id}`
-                 VALUES({values});
+                 ({", ".join(f"`{column}`" for column in columns)})
+                 VALUES({", ".join(f"@p{i}" for i in range(len(columns)))});
+            """
+        return self.run_query(
+            query,
+            {f"p{i}": row[column] for i, column in enumerate(columns)},
+            label=f"{table_id}.insert_row",
+        )
+
+    def insert_rows_json(
+        self, table_id: str, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Streams rows into the specified table with a single API call.
+
+        Unlike insert_row, this runs no DML job, so it isn't subject to the
+        DML quotas and can write many rows at once.
+
+        Args:
+            table_id: The ID of the table.
+            rows: The rows to insert, as JSON compatible dictionaries keyed
+                  by column name.
+
+        Returns:
+            The errors of the rejected rows, empty if every row was
+            inserted.
+        """
+        return self.client.insert_rows_json(
+            f"{BIG_QUERY_DATASET}.{table_id}", rows
+        )
+
+    def merge_rows(
+        self, table_id: str, id_column: str, rows: Sequence[Dict[str, Any]]
+    ):
+        """
+        Upserts rows with a single MERGE statement.
+
+        Rows whose ID already exists are updated, the others are inserted.
+        Every row must have the same columns, including `id_column`.
+
+        Args:
+            table_id: The ID of the table.
+            id_column: The name of the column containing the IDs.
+            rows: The rows to upsert, by column name.
+
+        Returns:
+            The result of the query execution.
+        """
+        if not rows:
+            return None
+        columns = [f"`{column}`" for column in rows[0]]
+        updates = ", ".join(
+            f"{column} = source.{column}"
+            for column in columns
+            if column != f"`{id_column}`"
+        )
+        query = f"""
+                MERGE `{BIG_QUERY_DATASET}.{table_id}` target
+                 USING UNNEST(@rows) source
+                 ON target.`{id_column}` = source.`{id_column}`
+                 WHEN MATCHED THEN UPDATE SET {updates}
+                 WHEN NOT MATCHED THEN INSERT ({", ".join(columns)})
+                 VALUES({", ".join(f"source.{c}" for c in columns)});
             """
-        return self.run_query(query)
+        return self.run_query(
+            query, {"rows": list(rows)}, label=f"{table_id}.merge_rows"
+        )
 
     def delete_multiple_rows_by_id(
         self, table_id: str, id_column: str, ids: List[str]
@@ -127,9 +353,10 @@ class BigQueryRepository:
         return self.run_query(
             f"""
                 DELETE FROM `{BIG_QUERY_DATASET}.{table_id}`
-                 WHERE {id_column}
-                 IN UNNEST([{', '.join(f'"{id}"' for id in ids)}]);
-            """
+                 WHERE {id_column} IN UNNEST(@ids);
+            """,
+            {"ids": ids},
+            label=f"{table_id}.delete_multiple_rows_by_id",
         )
 
     def update_row_by_id(
@@ -137,7 +364,7 @@ class BigQueryRepository:
         table_id: str,
         id_column: str,
         id_value: str,
-        column_value: Dict[str, str],
+        column_value: Dict[str, Any],
     ):
         """
         Updates specific columns of a row identified by its ID.
@@ -146,38 +373,69 @@ class BigQueryRepository:
             table_id: The ID of the table.
             id_column: The name of the column containing the ID.
             id_value: The specific ID value of the row to update.
-            column_value_map: A dictionary where keys are column names and
-                              values are the new values (as strings, including
-                              quotes if necessary for SQL).
+            column_value: A dictionary where keys are column names and
+                          values are their new values.
 
         Returns:
             The result of the query execution.
         """
-        sets = ""
-        for k, v in column_value.items():
-            sets += f"{k}={v},"
-        sets = sets[:-1]
-        query = f"""
+        return self.update_rows_by_ids(
+            table_id, id_column, [id_value], column_value
+        )
+
+    def update_rows_by_ids(
+        self,
+        table_id: str,
+        id_column: str,
+        ids: List[str],
+        column_value: Dict[str, Any],
+    ):
+        """
+        Updates the same columns of several rows in a single statement.
+
+        Args:
+            table_id: The ID of the table.
+            id_column: The name of the column containing the IDs.
+            ids: A list of ID values of the rows to update.
+            column_value: A dictionary where keys are column names and
+                          values are their new values.
+
+        Returns:
+            The result of the query execution.
+        """
+        columns = list(column_value)
+        sets = ", ".join(
+            f"`{column}` = @p{i}" for i, column in enumerate(columns)
+        )
+        return self.run_query(
+            f"""
                 UPDATE `{BIG_QUERY_DATASET}.{table_id}`
                  SET {sets}
-                 WHERE {id_column} = "{id_value}";
-            """
-        return self.run_query(query)
+                 WHERE {id_column} IN UNNEST(@ids);
+            """,
+            {
+                "ids": ids,
+                **{f"p{i}": column_value[c] for i, c in enumerate(columns)},
+            },
+            label=f"{table_id}.update_rows_by_ids",
+        )
 
-    def get_all_rows(self, table_id: str):
+    def get_all_rows(self, table_id: str, columns: Optional[List[str]] = None):
         """
         Retrieves all rows from the specified table.
 
         Args:
             table_id: The ID of the table.
+            columns: The columns to read, in order. Defaults to every
+                     column.
 
         Returns:
             A RowIterator containing all rows in the table.
         """
         query = f"""
-                    SELECT * from `{BIG_QUERY_DATASET}.{table_id}`
+                    SELECT {projection(columns)} from `{BIG_QUERY_DATASET}.{table_id}`
                 """
-        return self.run_query(query)
+        return self.run_query(query, label=f"{table_id}.get_all_rows")
 
     def delete_row_by_id(self, table_id: str, id_column: str, id_value: str):
         """
@@ -193,6 +451,8 @@ class BigQueryRepository:
         """
         query = f"""
                 DELETE FROM `{BIG_QUERY_DATASET}.{table_id}`
-                 WHERE {id_column} = "{id_value}"
+                 WHERE {id_column} = @id
             """
-        return self.run_query(query)
+        return self.run_query(
+            query, {"id": id_value}, label=f"{table_id}.delete_row_by_id"
+        )
@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provides read access to the chunk stores built by create-intent.
+
+The create-intent function writes, next to the embeddings of an intent, a
+SQLite file mapping each datapoint id to its chunk text. ChunkStore keeps
+a local copy of it, so the neighbors of a query resolve to text with an
+indexed lookup instead of a BigQuery job. BigQuery stays the system of
+record and the fallback for ids the store doesn't have.
+"""
+
+import sqlite3
+from os import getenv, listdir, makedirs, remove, replace
+from os.path import exists, join
+from tempfile import NamedTemporaryFile, gettempdir
+from threading import local
+from time import monotonic
+from typing import Dict, List, Optional
+from src.model.intent import Intent
+from src.repository.cloud_storage import (
+    CHUNKS_FILE,
+    CHUNKS_FOLDER,
+    CloudStorageRepository,
+)
+
+CHUNK_STORE_CACHE_DIR = getenv(
+    "CHUNK_STORE_CACHE_DIR", join(gettempdir(), "quick-bot-chunks")
+)
+# How often a chunk store checks whether the intent was re-indexed.
+CHUNK_STORE_TTL_SECONDS = int(getenv("CHUNK_STORE_TTL_SECONDS", "300"))
+
+
+class ChunkStore:
+    """A read-only, local copy of the chunk store of an intent.
+
+    Attributes:
+        path: The local path of the SQLite file.
+        index_name: The name of the index the chunks belong to. Lookups
+                    for another index must fall back to BigQuery.
+    """
+
+    def __init__(self, path: str):
+        """Opens the SQLite file at `path`."""
+        self.path = path
+        self._connections = local()
+        self._loaded_at = monotonic()
+        row = (
+            self._connection()
+            .execute("SELECT value FROM metadata WHERE key = 'index_name'")
+            .fetchone()
+        )
+        self.index_name = row[0] if row else ""
+
+    @classmethod
+    def load(
+        cls,
+        intent: Intent,
+        gcs_repository: Optional[CloudStorageRepository] = None,
+    ) -> Optional["ChunkStore"]:
+        """Downloads the chunk store of an intent, or returns None if missing.
+
+        The file is cached in CHUNK_STORE_CACHE_DIR by blob generation, so
+        it is only downloaded again after the intent is re-indexed.
+        """
+        gcs_repository = gcs_repository or CloudStorageRepository()
+        blob = gcs_repository.get_app_blob(
+            f"{CHUNKS_FOLDER}/{intent.name}/{CHUNKS_FILE}"
+        )
+        if not blob:
+            return None
+
+        directory = join(CHUNK_STORE_CACHE_DIR, intent.get_standard_name())
+        makedirs(directory, exist_ok=True)
+        path = join(directory, f"{blob.generation}.db")
+        if not exists(path):
+            # Downloaded under a temporary name, so concurrent loads never
+            # open a partial file, and pinned to the generation the file is
+            # named after.
+            with NamedTemporaryFile(dir=directory, delete=False) as tmp:
+                blob.bucket.blob(
+                    blob.name, generation=blob.generation
+                ).download_to_file(tmp)
+            replace(tmp.name, path)
+            _remove_older_generations(directory, blob.generation)
+        return cls(path)
+
+    def get_texts(self, ids: List[str]) -> Dict[str, str]:
+        """Returns the text of the given chunk ids that are in the store."""
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" * len(ids))
+        rows = self._connection().execute(
+            f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", ids
+        )
+        return dict(rows)
+
+    def is_stale(self) -> bool:
+        """Whether the store is due to be reloaded."""
+        if monotonic() - self._loaded_at < CHUNK_STORE_TTL_SECONDS:
+            return False
+        self._loaded_at = monotonic()
+        return True
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared across threads.
+        connection = getattr(self._connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro&immutable=1",
+                uri=True,
+                check_same_thread=False,
+            )
+            self._connections.connection = connection
+        return connection
+
+
+def _remove_older_generations(directory: str, generation: int):
+    """Deletes the chunk stores of generations older than `generation`.
+
+    Newer generations, written by workers that already reloaded, and the
+    temporary files of downloads in progress are left alone.
+    """
+    for name in listdir(directory):
+        stem, _, suffix = name.partition(".")
+        if suffix == "db" and stem.isdigit() and int(stem) < generation:
+            try:
+                remove(join(directory, name))
+            except FileNotFoundError:
+                pass  # Already removed by another worker.
@@ -19,14 +19,19 @@ and includes the CloudStorageRepository class, which encapsulates operations
 for interacting with GCS objects, such as listing files within a specific path.
 """
 
-from typing import List
-from google.cloud.storage import Client, Blob
+from typing import List, Optional
+from google.cloud.storage import Blob
+from src.utils.clients import CLIENTS
 
 BUCKET = "quick-bot"
 
 INTENT_FOLDER = "intents"
 EMBEDDINGS_FILE = "embeddings.json"
 EMBEDDINGS_FOLDER = "embeddings"
+MANIFESTS_FOLDER = "manifests"
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FOLDER = "chunks"
+CHUNKS_FILE = "chunks.db"
 
 CONTENT_TYPE = "text/plain"
 
@@ -42,8 +47,9 @@ class CloudStorageRepository:
     """
 
     def __init__(self):
-        """Initializes the CloudStorageRepository with a GCS client."""
-        self.client = Client()
+        """Initializes the CloudStorageRepository with the shared GCS
+        client."""
+        self.client = CLIENTS.storage()
 
     def list(self, full_path: str) -> List[Blob]:
         """Lists all blobs (files) within a specified GCS path.
@@ -69,3 +75,18 @@ class CloudStorageRepository:
         bucket = full_path.split("/")[2]
         prefix = full_path.replace(f"gs://{bucket}/", "")
         return list(self.client.list_blobs(bucket, prefix=prefix))
+
+    def get_app_blob(self, resource_name: str) -> Optional[Blob]:
+        """Gets a blob of the application bucket with its metadata.
+
+        The application bucket holds the files written by the create-intent
+        function, such as the embeddings and manifest of each intent.
+
+        Args:
+            resource_name: The name of the blob within the bucket.
+
+        Returns:
+            The google.cloud.storage.blob.Blob, or None if it doesn't exist.
+        """
+        bucket = self.client.bucket(f"{BUCKET}-{self.client.project}")
+        return bucket.get_blob(resource_name)
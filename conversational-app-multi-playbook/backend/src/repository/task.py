@@ -27,6 +27,7 @@ Requires the following environment variables to be set:
 from google.cloud.tasks_v2 import CloudTasksClient, HttpMethod
 import google.auth
 from src.model.event import IntentCreateEvent
+from src.utils.clients import CLIENTS
 from json import dumps
 from os import getenv
 
@@ -36,7 +37,7 @@ URL = getenv("FUNCTION_URL")
 
 
 def get_project_id():
-    """Retrieves the default Google Cloud project ID using 
+    """Retrieves the default Google Cloud project ID using
     application default credentials.
 
     Returns:
@@ -47,8 +48,7 @@ def get_project_id():
             are not found or configured correctly.
     """
     try:
-        _, project_id = google.auth.default()
-        return project_id
+        return CLIENTS.project_id()
     except google.auth.exceptions.DefaultCredentialsError as e:
         print(f"Error: {e}")
         return None
@@ -67,12 +67,12 @@ class TaskRepository:
     def __init__(self):
         """Initializes the TaskRepository.
 
-        Creates a CloudTasksClient instance and retrieves the project ID.
+        Uses the shared CloudTasksClient instance.
 
         Raises:
             RuntimeError: If the Google Cloud project ID cannot be determined.
         """
-        self.client = CloudTasksClient()
+        self.client: CloudTasksClient = CLIENTS.tasks()
 
     def create(self, event: IntentCreateEvent):
         """Creates a Cloud Task to handle an IntentCreateEvent.
@@ -16,35 +16,33 @@
 
 This module provides the ChatsService class, which handles the logic
 for persisting chat records (questions and answers) to the database.
-It interacts primarily with the BigQuery repository.
+Records are written in batches by the chat log writer.
 """
 
-from src.repository.big_query import (
-    BigQueryRepository,
-    CHATS_TABLE,
-)
 from src.model.chats import Chat
+from src.service.chat_log import CHAT_LOG_WRITER, ChatLogWriter
 
 
 class ChatsService:
     """Handles business logic related to chat history.
 
-    This service interacts with the BigQuery repository to save
-    chat conversation records.
+    This service hands chat conversation records to the chat log writer,
+    which saves them to BigQuery in batches.
 
     Attributes:
-        repository: An instance of BigQueryRepository for database operations.
+        writer: The ChatLogWriter buffering the chats.
     """
 
-    def __init__(self):
-        """Initializes the ChatsService with a BigQueryRepository."""
-        self.repository = BigQueryRepository()
+    def __init__(self, writer: ChatLogWriter = CHAT_LOG_WRITER):
+        """Initializes the ChatsService with the shared chat log writer."""
+        self.writer = writer
 
     def insert_chat(self, chat: Chat):
-        """Inserts a single chat record into the database.
+        """Queues a single chat record to be inserted into the database.
+
+        Blocks while the writer buffer is full.
 
         Args:
             chat: The Chat object containing the conversation details to save.
         """
-        values = chat.to_insert_string()
-        self.repository.insert_row(CHATS_TABLE, values)
+        self.writer.write(chat)
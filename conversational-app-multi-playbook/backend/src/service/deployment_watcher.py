@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background reconciliation of the intent index deployments.
+
+The create-intent function deploys the index of a Matching Engine intent
+asynchronously, and the intent stays pending until its endpoint has a
+deployed index. The DeploymentWatcher checks the pending intents on a
+schedule instead of on every GET /api/intents: a single endpoint listing
+per cycle, a single UPDATE for every intent whose deployment finished,
+and a refresh of the intent registry so readers see the new status.
+"""
+
+from asyncio import sleep, to_thread
+from os import getenv
+from typing import List
+from src.service.index_endpoint import IndexEndpointService
+from src.service.intent import IntentService
+from src.service.intent_registry import INTENT_REGISTRY, IntentRegistry
+
+DEPLOYMENT_WATCHER_INTERVAL_SECONDS = int(
+    getenv("DEPLOYMENT_WATCHER_INTERVAL_SECONDS", "30")
+)
+ACTIVE_STATUS = "5"
+
+
+class DeploymentWatcher:
+    """Marks intents as active once their index is deployed.
+
+    Attributes:
+        registry: The intent registry read for pending intents and
+                  refreshed after their status changes.
+        interval_seconds: Interval between two reconciliations. A value
+                          of zero or less disables the poll.
+    """
+
+    def __init__(
+        self,
+        registry: IntentRegistry = INTENT_REGISTRY,
+        interval_seconds: int = DEPLOYMENT_WATCHER_INTERVAL_SECONDS,
+    ):
+        """Initializes the watcher."""
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+
+    def reconcile(self) -> List[str]:
+        """Activates the pending intents whose index is deployed.
+
+        Returns:
+            The names of the intents that were activated.
+        """
+        pending = [
+            intent
+            for intent in self.registry.get_all()
+            if not intent.is_active() and intent.uses_matching_engine()
+        ]
+        if not pending:
+            return []
+
+        deployed = IndexEndpointService().get_deployed_endpoint_names()
+        activated = [
+            intent.name
+            for intent in pending
+            if intent.get_standard_name() in deployed
+        ]
+        if activated:
+            IntentService().update_status(activated, ACTIVE_STATUS)
+            self.registry.refresh()
+        return activated
+
+    async def poll(self):
+        """Reconciles every `interval_seconds` until cancelled."""
+        if self.interval_seconds <= 0:
+            return
+        while True:
+            await sleep(self.interval_seconds)
+            try:
+                await to_thread(self.reconcile)
+            except Exception as e:
+                print(f"Error reconciling intent deployments: {e}")
+
+
+DEPLOYMENT_WATCHER = DeploymentWatcher()
@@ -50,19 +50,20 @@ class EmbeddingService:
         Returns:
             The created Embedding object.
         """
-        self.repository.insert_row(
-            EMBEDDINGS_TABLE, embedding.to_insert_string()
-        )
+        self.repository.insert_row(EMBEDDINGS_TABLE, embedding.to_row())
         return embedding
 
     def create_all(self, embeddings: List[Embedding]):
         """Creates multiple embedding records in the database.
 
-        Iterates through the list and calls the `create` method 
-        for each embedding.
+        Upserts every embedding with a single MERGE statement, so creating
+        the same embeddings again updates them instead of duplicating them.
 
         Args:
             embeddings: A list of Embedding objects to create.
         """
-        for embedding in embeddings:
-            self.create(embedding)
+        self.repository.merge_rows(
+            EMBEDDINGS_TABLE,
+            INTENTS_TABLE_ID_COLUMN,
+            [embedding.to_row() for embedding in embeddings],
+        )
@@ -12,10 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
+from typing import List, Set
 from google.cloud.aiplatform import MatchingEngineIndexEndpoint
 from src.repository.big_query import BigQueryRepository
-from src.service.vertex_ai import EMBEDDINGS_MODEL
+from src.service.vertex_ai import QUERY_EMBEDDINGS
 
 BIG_QUERY_ID_COLUMN = "id"
 BIG_QUERY_INDEX_COLUMN = "index"
@@ -58,8 +58,17 @@ class IndexEndpointService:
         MatchingEngineIndexEndpoint.delete(endpoint, force=True)
 
     def create_embeddings(self, chunk: str) -> List[float]:
-        return EMBEDDINGS_MODEL.embed_query(chunk)
+        return QUERY_EMBEDDINGS.embed_query(chunk)
 
     def endpoint_has_deployed_indexes(self, name: str) -> bool:
         index_endpoint = self.get_endpoint(name)
         return len(index_endpoint.deployed_indexes) > 0
+
+    def get_deployed_endpoint_names(self) -> Set[str]:
+        """Lists every index endpoint once and returns the display names of
+        those with at least one deployed index."""
+        return {
+            index_endpoint.display_name
+            for index_endpoint in MatchingEngineIndexEndpoint.list()
+            if index_endpoint.deployed_indexes
+        }
@@ -14,20 +14,23 @@
 
 """Service layer for managing chatbot intents.
 
-This module provides the IntentService class, which encapsulates the 
-business logic for creating, retrieving, updating, and deleting intents. 
-It interacts with BigQuery for persistent storage and Google Cloud Storage 
+This module provides the IntentService class, which encapsulates the
+business logic for creating, retrieving, updating, and deleting intents.
+It interacts with BigQuery for persistent storage and Google Cloud Storage
 to validate data sources for certain intent types.
 """
 
 from src.model.http_status import BadRequest
 from src.model.intent import Intent
-from src.repository.big_query import BIG_QUERY_DATASET, BigQueryRepository
+from src.repository.big_query import BigQueryRepository
 from src.repository.cloud_storage import CloudStorageRepository
+from src.service.response_cache import RESPONSE_CACHE
 from typing import List
 
 INTENTS_TABLE = "intents"
 INTENTS_TABLE_ID_COLUMN = "name"
+# Read in schema order, which Intent.__from_row__ relies on.
+INTENTS_TABLE_COLUMNS = [field.name for field in Intent.__schema__()]
 
 
 class IntentService:
@@ -38,7 +41,7 @@ class IntentService:
 
     Attributes:
         repository: An instance of BigQueryRepository for database operations.
-        gcs_repository: An instance of CloudStorageRepository for GCS 
+        gcs_repository: An instance of CloudStorageRepository for GCS
         operations.
     """
 
@@ -47,6 +50,18 @@ class IntentService:
         self.repository = BigQueryRepository()
         self.gcs_repository = CloudStorageRepository()
 
+    def get_columns(self) -> List[str]:
+        """Returns the intent columns to read and write.
+
+        Columns added after a dataset was created, such as
+        vector_search_backend, are left out until the dataset is migrated
+        with scripts/migrate_big_query.py.
+        """
+        existing = self.repository.get_table_columns(INTENTS_TABLE)
+        return [
+            column for column in INTENTS_TABLE_COLUMNS if column in existing
+        ]
+
     def get(self, intent_name: str):
         """Retrieves a single intent by its name.
 
@@ -57,9 +72,11 @@ class IntentService:
             An Intent object if found, otherwise None.
         """
         intent = None
-        results = self.repository.run_query(
-            f'''SELECT * FROM `{BIG_QUERY_DATASET}.{INTENTS_TABLE}`
-             WHERE name = "{intent_name}"'''
+        results = self.repository.get_row_by_id(
+            INTENTS_TABLE,
+            INTENTS_TABLE_ID_COLUMN,
+            intent_name,
+            self.get_columns(),
         )
         for row in results:
             intent = Intent.__from_row__(row)
@@ -70,12 +87,12 @@ class IntentService:
         """Retrieves all intents from the database.
 
         Returns:
-            A list of Intent objects. Returns an empty list if no 
+            A list of Intent objects. Returns an empty list if no
             intents are found.
         """
         intents = []
-        results = self.repository.run_query(
-            f"SELECT * FROM `{BIG_QUERY_DATASET}.{INTENTS_TABLE}`"
+        results = self.repository.get_all_rows(
+            INTENTS_TABLE, self.get_columns()
         )
         for row in results:
             intent = Intent.__from_row__(row)
@@ -100,9 +117,9 @@ class IntentService:
         Raises:
             BadRequest: If an intent with the same name already exists, or if
                         a specified GCS bucket path is empty or invalid.
-            google.cloud.exceptions.NotFound: If the GCS bucket specified 
+            google.cloud.exceptions.NotFound: If the GCS bucket specified
             in the intent does not exist.
-            google.api_core.exceptions.GoogleAPICallError: For other 
+            google.api_core.exceptions.GoogleAPICallError: For other
             GCS API errors.
         """
         if self.get(intent.name):
@@ -118,7 +135,13 @@ class IntentService:
             )
         if not intent.gcp_bucket:
             intent.status = "5"
-        self.repository.insert_row(INTENTS_TABLE, intent.to_insert_string())
+        columns = self.get_columns()
+        row = {
+            column: value
+            for column, value in intent.to_row().items()
+            if column in columns
+        }
+        self.repository.insert_row(INTENTS_TABLE, row)
         return intent
 
     def update(self, intent_name: str, intent: Intent):
@@ -136,18 +159,41 @@ class IntentService:
         Returns:
             None
         """
+        row = intent.to_row()
         update_dict = {
-            "ai_model": f'"{intent.ai_model}"',
-            "ai_temperature": f"{intent.ai_temperature}",
-            "prompt": f'"""{intent.prompt}"""',
-            "questions": f"{str(intent.questions)}",
-            "status": f'"{intent.status}"',
+            column: row[column]
+            for column in [
+                "ai_model",
+                "ai_temperature",
+                "prompt",
+                "questions",
+                "status",
+            ]
         }
         self.repository.update_row_by_id(
             INTENTS_TABLE, INTENTS_TABLE_ID_COLUMN, intent_name, update_dict
         )
+        # Cached answers were generated with the previous prompt and model.
+        RESPONSE_CACHE.invalidate(intent_name)
+
+    def update_status(self, intent_names: List[str], status: str):
+        """Sets the status of several intents with a single UPDATE.
+
+        Args:
+            intent_names: The names of the intents to update.
+            status: The new status of the intents.
+        """
+        if not intent_names:
+            return
+        self.repository.update_rows_by_ids(
+            INTENTS_TABLE,
+            INTENTS_TABLE_ID_COLUMN,
+            intent_names,
+            {"status": status},
+        )
 
     def delete(self, intent_name: str):
         self.repository.delete_row_by_id(
             INTENTS_TABLE, INTENTS_TABLE_ID_COLUMN, intent_name
         )
+        RESPONSE_CACHE.invalidate(intent_name)
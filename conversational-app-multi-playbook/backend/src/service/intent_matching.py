@@ -12,46 +12,203 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from numpy import argsort
-from langchain.utils.math import cosine_similarity
+from dataclasses import dataclass
+from threading import Lock
+from numpy import (
+    argmax,
+    argpartition,
+    argsort,
+    asarray,
+    diff,
+    empty,
+    flatnonzero,
+    float32,
+    maximum,
+    ndarray,
+    zeros,
+)
+from numpy.linalg import norm
 from src.model.intent import Intent
-from src.service.vertex_ai import EMBEDDINGS_MODEL
-from typing import List
+from src.service.vertex_ai import EMBEDDINGS_MODEL, QUERY_EMBEDDINGS
+from src.utils.utils import generate_hash, intent_questions_to_json
+from typing import Dict, List, Optional
+
+SUGGESTED_QUESTIONS_COUNT = 2
+
+
+@dataclass(frozen=True)
+class IntentEmbeddings:
+    """Immutable snapshot of the embeddings of every intent question.
+
+    Attributes:
+        fingerprint: Hash of the intent names and questions the snapshot
+                     was built from.
+        intent_names: The intent names, in the order their rows appear in
+                      the matrix.
+        offsets: Row-offset table. The questions of `intent_names[i]` live
+                 in rows `offsets[i]:offsets[i + 1]` of the matrix.
+        matrix: Contiguous float32 matrix with one L2-normalized row per
+                question, so a dot product equals the cosine similarity.
+    """
+
+    fingerprint: str
+    intent_names: List[str]
+    offsets: ndarray
+    matrix: ndarray
+
+
+EMPTY_INTENT_EMBEDDINGS = IntentEmbeddings(
+    fingerprint="",
+    intent_names=[],
+    offsets=zeros(1, dtype=int),
+    matrix=empty((0, 0), dtype=float32),
+)
+
+
+class IntentEmbeddingStore:
+    """Process-wide store for the intent question embeddings.
+
+    The embeddings are computed once and shared by every request. They are
+    only recomputed when the fingerprint of the intent names and questions
+    changes, so status or prompt updates do not trigger new embedding calls.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._embeddings = EMPTY_INTENT_EMBEDDINGS
+
+    def get(self, intents: List[Intent]) -> IntentEmbeddings:
+        """Returns the embeddings for the given intents, building if stale.
+
+        Args:
+            intents: The current list of intents.
+
+        Returns:
+            An IntentEmbeddings snapshot matching the given intents.
+        """
+        fingerprint = generate_hash(intent_questions_to_json(intents))
+        embeddings = self._embeddings
+        if embeddings.fingerprint == fingerprint:
+            return embeddings
+
+        with self._lock:
+            if self._embeddings.fingerprint != fingerprint:
+                self._embeddings = self._build(intents, fingerprint)
+            return self._embeddings
+
+    def _build(
+        self, intents: List[Intent], fingerprint: str
+    ) -> IntentEmbeddings:
+        questions = []
+        offsets = zeros(len(intents) + 1, dtype=int)
+        for ix, intent in enumerate(intents):
+            questions.extend(intent.questions)
+            offsets[ix + 1] = len(questions)
+
+        matrix = empty((0, 0), dtype=float32)
+        if questions:
+            matrix = asarray(
+                EMBEDDINGS_MODEL.embed_documents(questions), dtype=float32
+            )
+            matrix /= _row_norms(matrix)[:, None]
+
+        return IntentEmbeddings(
+            fingerprint=fingerprint,
+            intent_names=[intent.name for intent in intents],
+            offsets=offsets,
+            matrix=matrix,
+        )
+
+
+INTENT_EMBEDDINGS = IntentEmbeddingStore()
+
+
+def _row_norms(matrix: ndarray) -> ndarray:
+    norms = norm(matrix, axis=1)
+    norms[norms == 0] = 1
+    return norms
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    """Result of classifying a user query.
+
+    Attributes:
+        intent: The best matching intent, or None if no question of any
+                intent has a positive similarity with the query.
+        suggested_questions: The questions of the matched intent ranked right
+                             after the closest one, most similar first.
+        score: Cosine similarity between the query and the closest question.
+        query_embedding: The embedding of the query, reused downstream so
+                         the query is embedded only once per turn.
+    """
+
+    intent: Optional[Intent]
+    suggested_questions: List[str]
+    score: float
+    query_embedding: Optional[List[float]] = None
 
 
 class IntentMatchingService:
 
     def __init__(self, intents: List[Intent]):
-        self.intents_map = {}
-        self.questions_embeddings = {}
+        self.intents_map: Dict[str, Intent] = {
+            intent.name: intent for intent in intents
+        }
+        self.embeddings = INTENT_EMBEDDINGS.get(intents)
 
-        for intent in intents:
-            self.intents_map[intent.name] = intent
-            self.questions_embeddings[intent.name] = (
-                EMBEDDINGS_MODEL.embed_documents(intent.questions)
-            )
+    def classify(self, query: str) -> IntentMatch:
+        """Finds the intent and suggested questions for a user query.
+
+        The query is embedded once and scored against every intent question
+        with a single matrix-vector product. A segmented max over the row
+        offsets picks the winning intent, and the suggestions are ranked
+        within the winner's segment with argpartition.
 
-    def get_intent_from_query(self, query: str) -> Intent:
-        query_embeddings = EMBEDDINGS_MODEL.embed_query(query)
-        m = 0
-        intent = None
+        Args:
+            query: The user's query.
 
-        for intent_name, questions in self.questions_embeddings.items():
-            similarity = max(
-                cosine_similarity([query_embeddings], questions)[0]
+        Returns:
+            An IntentMatch with the inferred intent and suggested questions.
+        """
+        embeddings = self.embeddings
+        no_match = IntentMatch(intent=None, suggested_questions=[], score=0)
+        if not embeddings.matrix.size:
+            return no_match
+
+        query_embedding = QUERY_EMBEDDINGS.embed_query(query)
+        query_embeddings = asarray(query_embedding, dtype=float32)
+        query_norm = norm(query_embeddings)
+        if query_norm:
+            query_embeddings /= query_norm
+        scores = embeddings.matrix @ query_embeddings
+
+        # Intents without questions own no rows, so the remaining segment
+        # starts are strictly increasing and delimit one intent each.
+        non_empty = flatnonzero(diff(embeddings.offsets))
+        starts = embeddings.offsets[non_empty]
+        segment_max = maximum.reduceat(scores, starts)
+        best = argmax(segment_max)
+        score = float(segment_max[best])
+        if score <= 0:
+            return IntentMatch(
+                intent=None,
+                suggested_questions=[],
+                score=0,
+                query_embedding=query_embedding,
             )
-            if m < similarity:
-                m = similarity
-                intent = self.intents_map[intent_name]
-        return intent
-
-    def get_suggested_questions(self, query: str, intent: Intent) -> List[str]:
-        questions = intent.questions
-        query_embeddings = EMBEDDINGS_MODEL.embed_query(query)
-        similarity = cosine_similarity(
-            [query_embeddings], self.questions_embeddings[intent.name]
-        )[0]
-        suggested_questions = []
-        for ix in argsort(similarity)[-3:][::-1]:
-            suggested_questions.append(questions[ix])
-        return suggested_questions[1:]
+
+        ix = non_empty[best]
+        intent = self.intents_map[embeddings.intent_names[ix]]
+        segment = scores[embeddings.offsets[ix] : embeddings.offsets[ix + 1]]
+        k = min(SUGGESTED_QUESTIONS_COUNT + 1, len(segment))
+        top = argpartition(-segment, k - 1)[:k]
+        top = top[argsort(-segment[top])]
+
+        return IntentMatch(
+            intent=intent,
+            # The closest question is the one the user just asked.
+            suggested_questions=[intent.questions[q] for q in top[1:]],
+            score=score,
+            query_embedding=query_embedding,
+        )
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory registry of the chatbot intents.
+
+This module provides the IntentRegistry class, which keeps the intents
+stored in BigQuery in memory so the chat hot path never has to query
+BigQuery. The registry is loaded at startup, refreshed by the intent
+endpoints after every write and re-synced periodically by a TTL poll.
+"""
+
+from asyncio import sleep, to_thread
+from os import getenv
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+from src.model.intent import Intent
+from src.service.intent import IntentService
+from src.utils.utils import generate_hash, intents_to_json
+
+INTENT_REGISTRY_TTL_SECONDS = int(getenv("INTENT_REGISTRY_TTL_SECONDS", "300"))
+
+
+class IntentRegistry:
+    """Keeps an in-memory copy of the intents and notifies on changes.
+
+    Attributes:
+        ttl_seconds: Interval between two background refreshes. A value of
+                     zero or less disables the TTL poll.
+    """
+
+    def __init__(self, ttl_seconds: int = INTENT_REGISTRY_TTL_SECONDS):
+        """Initializes an empty registry."""
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._intents: Dict[str, Intent] = {}
+        self._fingerprint = ""
+        self._loaded = False
+        self._listeners: List[Callable[[List[Intent]], None]] = []
+
+    def get_all(self) -> List[Intent]:
+        """Returns a copy of every registered intent.
+
+        The intents are loaded from BigQuery on first use if the registry
+        was not loaded at startup.
+        """
+        if not self._loaded:
+            self.refresh()
+        return [intent.model_copy() for intent in self._intents.values()]
+
+    def get(self, intent_name: str) -> Optional[Intent]:
+        """Returns a copy of a single intent, or None if it doesn't exist."""
+        if not self._loaded:
+            self.refresh()
+        intent = self._intents.get(intent_name)
+        return intent.model_copy() if intent else None
+
+    def add_listener(self, listener: Callable[[List[Intent]], None]):
+        """Registers a callback invoked with the intents after a change."""
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """Reloads the intents from BigQuery.
+
+        Listeners are notified only when the loaded intents differ from the
+        ones already in memory. A failing listener is logged and doesn't
+        prevent the others from running.
+        """
+        intents = IntentService().get_all()
+        fingerprint = generate_hash(intents_to_json(intents))
+
+        with self._lock:
+            changed = fingerprint != self._fingerprint
+            self._intents = {intent.name: intent for intent in intents}
+            self._fingerprint = fingerprint
+            self._loaded = True
+
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(self.get_all())
+                except Exception as e:
+                    name = getattr(listener, "__name__", repr(listener))
+                    print(f"Error notifying {name} of intent changes: {e}")
+
+    async def poll(self):
+        """Refreshes the registry every `ttl_seconds` until cancelled."""
+        if self.ttl_seconds <= 0:
+            return
+        while True:
+            await sleep(self.ttl_seconds)
+            try:
+                await to_thread(self.refresh)
+            except Exception as e:
+                print(f"Error refreshing intents: {e}")
+
+
+INTENT_REGISTRY = IntentRegistry()
@@ -0,0 +1,179 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Semantic cache of the answers generated for each intent.
+
+Users often ask the same question in slightly different words. The
+SemanticResponseCache returns the stored answer of a previous question to
+the same intent when the cosine similarity of the two query embeddings
+passes a threshold, which skips the retrieval and the Gemini generation.
+
+Answers are scoped by intent, model, temperature and prompt, so changing
+any of them never serves an answer generated with the old settings.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import sha256
+from itertools import count
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+from numpy import argmax, asarray, float32, ndarray, stack
+from numpy.linalg import norm
+from src.model.intent import Intent
+
+RESPONSE_CACHE_THRESHOLD = float(getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL_SECONDS = int(getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+Scope = Tuple[str, str]
+
+
+@dataclass
+class CachedResponse:
+    """An answer and the normalized embedding of the question it answers."""
+
+    embedding: ndarray
+    answer: str
+    expires_at: float
+
+
+class SemanticResponseCache:
+    """Thread-safe answer cache with similarity lookup, TTL and LRU.
+
+    Attributes:
+        threshold: Minimum cosine similarity between two questions for the
+                   answer of one to be returned for the other. A value
+                   above 1 disables the cache.
+        ttl_seconds: Lifetime of a cached answer.
+        max_entries: Maximum number of cached answers across intents. The
+                     least recently used answers are evicted beyond it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        """Initializes an empty cache."""
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._ids = count()
+        self._lru: OrderedDict = OrderedDict()
+        self._scopes: Dict[Scope, Dict[int, CachedResponse]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def lookup(self, intent: Intent, embedding: List[float]) -> Optional[str]:
+        """Returns the answer of the closest cached question, if any.
+
+        Args:
+            intent: The intent the question was classified as.
+            embedding: The embedding of the question.
+
+        Returns:
+            The cached answer, or None if no cached question of the intent
+            is similar enough.
+        """
+        if self.threshold > 1:
+            return None
+        query = _normalize(embedding)
+        scope = _scope(intent)
+        now = monotonic()
+
+        with self._lock:
+            entries = self._scopes.get(scope, {})
+            for entry_id in [
+                entry_id
+                for entry_id, entry in entries.items()
+                if entry.expires_at <= now
+            ]:
+                self._remove(scope, entry_id)
+
+            if entries:
+                ids = list(entries)
+                scores = stack([entries[i].embedding for i in ids]) @ query
+                best = int(argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._lru.move_to_end((scope, ids[best]))
+                    self._hits += 1
+                    return entries[ids[best]].answer
+            self._misses += 1
+            return None
+
+    def store(self, intent: Intent, embedding: List[float], answer: str):
+        """Caches the answer generated for a question."""
+        if self.threshold > 1 or not answer:
+            return
+        scope = _scope(intent)
+        entry = CachedResponse(
+            embedding=_normalize(embedding),
+            answer=answer,
+            expires_at=monotonic() + self.ttl_seconds,
+        )
+
+        with self._lock:
+            entry_id = next(self._ids)
+            self._scopes.setdefault(scope, {})[entry_id] = entry
+            self._lru[(scope, entry_id)] = None
+            while len(self._lru) > self.max_entries:
+                self._remove(*next(iter(self._lru)))
+                self._evictions += 1
+
+    def invalidate(self, intent_name: str):
+        """Drops every cached answer of an intent."""
+        with self._lock:
+            for scope in [s for s in self._scopes if s[0] == intent_name]:
+                for entry_id in list(self._scopes[scope]):
+                    self._remove(scope, entry_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, scope: Scope, entry_id: int):
+        entries = self._scopes[scope]
+        del entries[entry_id]
+        if not entries:
+            del self._scopes[scope]
+        del self._lru[(scope, entry_id)]
+
+
+def _scope(intent: Intent) -> Scope:
+    settings = f"{intent.ai_model}\n{intent.ai_temperature}\n{intent.prompt}"
+    return intent.name, sha256(settings.encode()).hexdigest()
+
+
+def _normalize(embedding: List[float]) -> ndarray:
+    vector = asarray(embedding, dtype=float32)
+    vector_norm = norm(vector)
+    return vector / vector_norm if vector_norm else vector
+
+
+RESPONSE_CACHE = SemanticResponseCache()
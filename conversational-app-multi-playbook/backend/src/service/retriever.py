@@ -0,0 +1,345 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Vector search backends used to retrieve the context of an intent.
+
+An intent is searched either on its deployed Vertex AI Matching Engine
+index endpoint, or in process by LocalRetriever. LocalRetriever loads the
+embeddings file written by the create-intent function into a memory
+mapped float32 matrix, so small intents need no dedicated endpoint and
+their search costs a matrix product instead of a network round trip.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from json import dumps, loads
+from os import getenv, listdir, makedirs, remove, replace
+from os.path import basename, dirname, exists, join
+from tempfile import NamedTemporaryFile, gettempdir
+from time import monotonic
+from typing import List, Optional
+
+import numpy as np
+from google.cloud.aiplatform import (
+    MatchingEngineIndex,
+    MatchingEngineIndexEndpoint,
+)
+from google.cloud.aiplatform_v1 import (
+    FindNeighborsRequest,
+    IndexDatapoint,
+    MatchServiceClient,
+)
+from src.model.intent import Intent
+from src.repository.cloud_storage import (
+    EMBEDDINGS_FILE,
+    EMBEDDINGS_FOLDER,
+    MANIFEST_FILE,
+    MANIFESTS_FOLDER,
+    CloudStorageRepository,
+)
+
+try:
+    import hnswlib
+except ImportError:  # Optional, only used for large local intents.
+    hnswlib = None
+
+LOCAL_INDEX_CACHE_DIR = getenv(
+    "LOCAL_INDEX_CACHE_DIR", join(gettempdir(), "quick-bot-indexes")
+)
+# How often a local intent checks whether its embeddings file was rebuilt.
+LOCAL_INDEX_TTL_SECONDS = int(getenv("LOCAL_INDEX_TTL_SECONDS", "300"))
+# Above this many chunks, local intents are searched on an HNSW graph when
+# hnswlib is installed. Below it, brute force is exact and fast enough.
+LOCAL_HNSW_MIN_CHUNKS = int(getenv("LOCAL_HNSW_MIN_CHUNKS", "50000"))
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# Files making up the cache of a generation, e.g. 1712345678.npy.
+CACHE_SUFFIXES = ("npy", "ids.json", "hnsw")
+
+
+class Retriever(ABC):
+    """Finds the chunks of an intent closest to a query embedding."""
+
+    @property
+    @abstractmethod
+    def index_name(self) -> str:
+        """Name of the index the chunk texts are stored under in BigQuery."""
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the search results of the retriever may change
+        in a way it can detect, e.g. after its index is rebuilt."""
+        return self.index_name
+
+    @abstractmethod
+    def search(self, embedding: List[float], neighbor_count: int) -> List[str]:
+        """Returns the ids of the closest chunks, closest first."""
+
+    def is_stale(self) -> bool:
+        """Whether the retriever is due to be reloaded."""
+        return False
+
+
+@dataclass(frozen=True)
+class IndexEndpointDescriptor:
+    """Everything needed to query the index deployed on an endpoint.
+
+    Resolved once per deployment, so a search is a single find_neighbors
+    call with no Vertex AI lookups.
+
+    Attributes:
+        endpoint: The resource name of the index endpoint.
+        deployed_index_id: The id of the index deployed on the endpoint.
+        index_name: The display name of the deployed index, which is also
+                    the name its chunk texts are stored under in BigQuery.
+        client: A client for the public domain of the endpoint.
+    """
+
+    endpoint: str
+    deployed_index_id: str
+    index_name: str
+    client: MatchServiceClient
+
+
+class MatchingEngineRetriever(Retriever):
+    """Searches the index deployed on a Matching Engine index endpoint."""
+
+    def __init__(self, descriptor: IndexEndpointDescriptor):
+        self.descriptor = descriptor
+
+    @classmethod
+    def load(cls, intent: Intent) -> Optional["MatchingEngineRetriever"]:
+        """Resolves the endpoint of an intent, or returns None if it has
+        no endpoint or no deployed index yet."""
+        ixs = MatchingEngineIndexEndpoint.list(
+            filter=f'display_name="{intent.get_standard_name()}"',
+        )
+        if len(ixs) == 0 or not ixs[0].deployed_indexes:
+            return None
+        deployed_index = ixs[0].deployed_indexes[0]
+        return cls(
+            IndexEndpointDescriptor(
+                endpoint=ixs[0].resource_name,
+                deployed_index_id=deployed_index.id,
+                index_name=MatchingEngineIndex(
+                    deployed_index.index
+                ).display_name,
+                # Configure Vector Search client
+                client=MatchServiceClient(
+                    client_options={
+                        "api_endpoint": ixs[0].public_endpoint_domain_name,
+                    },
+                ),
+            )
+        )
+
+    @property
+    def index_name(self) -> str:
+        return self.descriptor.index_name
+
+    def search(self, embedding: List[float], neighbor_count: int) -> List[str]:
+        query = FindNeighborsRequest.Query(
+            datapoint=IndexDatapoint(feature_vector=embedding),
+            neighbor_count=neighbor_count,
+        )
+        neighbors = (
+            self.descriptor.client.find_neighbors(
+                FindNeighborsRequest(
+                    index_endpoint=self.descriptor.endpoint,
+                    deployed_index_id=self.descriptor.deployed_index_id,
+                    # Request can have multiple queries
+                    queries=[query],
+                    return_full_datapoint=False,
+                )
+            )
+            .nearest_neighbors[0]
+            .neighbors
+        )
+        return [neighbor.datapoint.datapoint_id for neighbor in neighbors]
+
+
+class LocalRetriever(Retriever):
+    """Searches the embeddings of an intent in process.
+
+    Scores are dot products, like the DOT_PRODUCT_DISTANCE indexes built
+    by the create-intent function.
+
+    Attributes:
+        ids: The chunk id of each row of the matrix.
+        matrix: The (chunks, dimensions) float32 embeddings, memory mapped
+                from the local cache.
+        graph: An hnswlib index over the matrix, or None for brute force.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        index_name: str,
+        generation: Optional[int] = None,
+        graph=None,
+    ):
+        self.ids = ids
+        self.matrix = matrix
+        self.graph = graph
+        self.generation = generation
+        self._index_name = index_name
+        self._loaded_at = monotonic()
+
+    @classmethod
+    def load(
+        cls,
+        intent: Intent,
+        gcs_repository: Optional[CloudStorageRepository] = None,
+    ) -> Optional["LocalRetriever"]:
+        """Loads the embeddings of an intent, or returns None if missing.
+
+        The embeddings file is converted once to a .npy file in
+        LOCAL_INDEX_CACHE_DIR, keyed by the blob generation, and memory
+        mapped from there, so workers on the same host share the pages.
+        """
+        gcs_repository = gcs_repository or CloudStorageRepository()
+        manifest = gcs_repository.get_app_blob(
+            f"{MANIFESTS_FOLDER}/{intent.name}/{MANIFEST_FILE}"
+        )
+        blob = gcs_repository.get_app_blob(
+            f"{EMBEDDINGS_FOLDER}/{intent.name}/{EMBEDDINGS_FILE}"
+        )
+        if not manifest or not blob:
+            return None
+        index_name = loads(manifest.download_as_text())["index_name"]
+
+        directory = join(LOCAL_INDEX_CACHE_DIR, intent.get_standard_name())
+        makedirs(directory, exist_ok=True)
+        base = join(directory, str(blob.generation))
+        if not exists(f"{base}.npy"):
+            _build_cache(blob, base)
+            _remove_older_generations(directory, blob.generation)
+
+        matrix = np.load(f"{base}.npy", mmap_mode="r")
+        with open(f"{base}.ids.json", encoding="utf-8") as ids_file:
+            ids = loads(ids_file.read())
+
+        graph = None
+        if hnswlib and len(ids) >= LOCAL_HNSW_MIN_CHUNKS:
+            graph = _load_graph(matrix, f"{base}.hnsw")
+        return cls(ids, matrix, index_name, blob.generation, graph)
+
+    @property
+    def index_name(self) -> str:
+        return self._index_name
+
+    @property
+    def version(self) -> str:
+        return f"{self._index_name}:{self.generation}"
+
+    def search(self, embedding: List[float], neighbor_count: int) -> List[str]:
+        neighbor_count = min(neighbor_count, len(self.ids))
+        if neighbor_count <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+
+        if self.graph is not None:
+            labels, _ = self.graph.knn_query(query, k=neighbor_count)
+            return [self.ids[label] for label in labels[0]]
+
+        scores = self.matrix @ query
+        top = np.argpartition(-scores, neighbor_count - 1)[:neighbor_count]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[i] for i in top]
+
+    def is_stale(self) -> bool:
+        if monotonic() - self._loaded_at < LOCAL_INDEX_TTL_SECONDS:
+            return False
+        self._loaded_at = monotonic()
+        return True
+
+
+def _build_cache(blob, base: str):
+    """Converts an embeddings JSONL blob to a .npy matrix and an id list.
+
+    Files are written under temporary names and renamed, so concurrent
+    loads never read a partial cache.
+    """
+    with NamedTemporaryFile(dir=dirname(base), delete=False) as jsonl:
+        blob.download_to_file(jsonl)
+
+    rows, dimensions = 0, 0
+    with open(jsonl.name, encoding="utf-8") as lines:
+        for line in lines:
+            if line.strip():
+                if not rows:
+                    dimensions = len(loads(line)["embedding"])
+                rows += 1
+
+    ids = []
+    matrix_path = f"{base}.npy.{basename(jsonl.name)}"
+    matrix = np.lib.format.open_memmap(
+        matrix_path, mode="w+", dtype=np.float32, shape=(rows, dimensions)
+    )
+    with open(jsonl.name, encoding="utf-8") as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            datapoint = loads(line)
+            matrix[len(ids)] = datapoint["embedding"]
+            ids.append(datapoint["id"])
+    matrix.flush()
+    del matrix
+    remove(jsonl.name)
+
+    ids_path = f"{matrix_path}.ids"
+    with open(ids_path, "w", encoding="utf-8") as ids_file:
+        ids_file.write(dumps(ids))
+    replace(ids_path, f"{base}.ids.json")
+    replace(matrix_path, f"{base}.npy")
+
+
+def _remove_older_generations(directory: str, generation: int):
+    """Deletes the cache files of generations older than `generation`.
+
+    Only complete files are matched by name, so the temporary files of
+    other workers still building a cache are left alone.
+    """
+    for name in listdir(directory):
+        stem, _, suffix = name.partition(".")
+        if (
+            suffix in CACHE_SUFFIXES
+            and stem.isdigit()
+            and int(stem) < generation
+        ):
+            try:
+                remove(join(directory, name))
+            except FileNotFoundError:
+                pass  # Already removed by another worker.
+
+
+def _load_graph(matrix: np.ndarray, path: str):
+    """Loads the HNSW graph of a matrix, building it on first use."""
+    graph = hnswlib.Index(space="ip", dim=matrix.shape[1])
+    if exists(path):
+        graph.load_index(path, max_elements=matrix.shape[0])
+    else:
+        graph.init_index(
+            max_elements=matrix.shape[0],
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            M=HNSW_M,
+        )
+        graph.add_items(matrix, np.arange(matrix.shape[0]))
+        with NamedTemporaryFile(dir=dirname(path), delete=False) as tmp:
+            graph.save_index(tmp.name)
+        replace(tmp.name, path)
+    graph.set_ef(HNSW_EF_SEARCH)
+    return graph
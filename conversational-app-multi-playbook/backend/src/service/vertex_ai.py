@@ -12,122 +12,228 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import sqlite3
+import numpy as np
+from hashlib import sha256
+from os import getenv
 from langchain_google_vertexai import VertexAIEmbeddings
 from vertexai.preview.generative_models import GenerativeModel
-from google.cloud import bigquery
-from google.cloud.aiplatform import (
-    MatchingEngineIndexEndpoint,
-    MatchingEngineIndex,
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.model.intent import LOCAL_BACKEND, Intent
+from src.repository.big_query import (
+    BIG_QUERY_DATASET,
+    EMBEDDINGS_TABLE,
+    BigQueryRepository,
 )
-from typing import List, MutableSequence
-from src.model.intent import Intent
-from src.repository.big_query import BIG_QUERY_DATASET, EMBEDDINGS_TABLE
-from google.cloud.aiplatform_v1 import (
-    FindNeighborsRequest,
-    IndexDatapoint,
-    MatchServiceClient,
-    FindNeighborsResponse,
+from src.repository.chunk_store import ChunkStore
+from src.service.response_cache import RESPONSE_CACHE
+from src.service.retriever import (
+    LocalRetriever,
+    MatchingEngineRetriever,
+    Retriever,
 )
 
-from src.utils.utils import generate_hash, intents_to_json
+from src.utils.cache import create_cache
+from src.utils.embedding_memo import QueryEmbeddingMemo
 
 MATCHING_ENGINE_INDEX_NEIGHBORS = 5
+CONTEXT_NEIGHBORS = 3
 
 TEXT_EMBEDDING_MODEL = "textembedding-gecko@003"
 
 EMBEDDINGS_MODEL = VertexAIEmbeddings(TEXT_EMBEDDING_MODEL)
+QUERY_EMBEDDINGS = QueryEmbeddingMemo(EMBEDDINGS_MODEL, TEXT_EMBEDDING_MODEL)
 
-INTENTS_HASH = ""
-INDEX_ENDPOINTS = {}
-INDEX_ENDPOINTS_CLIENTS = {}
+# Retrievers and chunk stores of the intents, keyed by standard name. They
+# are (re)loaded by load_intent_indexes when an intent is deployed or its
+# index settings change, never on the request path.
+RETRIEVERS: Dict[str, Retriever] = {}
+CHUNK_STORES: Dict[str, ChunkStore] = {}
+LOADED_INTENTS: Dict[str, Tuple[str, str, str]] = {}
+INDEXES_LOCK = Lock()
 
+# Chunk ids are content addressed and chunk texts are keyed by index name,
+# so text entries never go stale, they only have to be evicted.
+CHUNK_TEXT_CACHE = create_cache(
+    "chunk-text",
+    max_bytes=int(getenv("CHUNK_TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+# Neighbor entries are invalidated when a retriever of the intent reloads a
+# new index version. Matching Engine stream updates can't be detected, so
+# the TTL bounds how long they are ignored.
+NEIGHBORS_CACHE = create_cache(
+    "neighbors",
+    max_bytes=int(getenv("NEIGHBORS_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=int(getenv("NEIGHBORS_CACHE_TTL_SECONDS", "600")),
+)
 
-class VertexAIService:
 
-    def __init__(self, intents: List[Intent]):
-        global INTENTS_HASH
-        self.client = bigquery.Client()
+def embedding_cache_key(embedding: List[float]) -> str:
+    """Hashes a normalized embedding, rounded to absorb float noise."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector = vector / norm
+    return sha256(np.round(vector, 5).tobytes()).hexdigest()
+
+
+def index_settings(intent: Intent) -> Tuple[str, str, str]:
+    """The intent fields whose change means its index must be resolved
+    again. The status changes when the create-intent function deploys it.
+    """
+    return (
+        intent.gcp_bucket or "",
+        intent.status,
+        intent.get_vector_search_backend(),
+    )
+
+
+def load_retriever(intent: Intent) -> Optional[Retriever]:
+    if intent.get_vector_search_backend() == LOCAL_BACKEND:
+        return LocalRetriever.load(intent)
+    return MatchingEngineRetriever.load(intent)
+
 
-        new_hash = generate_hash(intents_to_json(intents))
+def set_retriever(intent: Intent, retriever: Retriever):
+    previous = RETRIEVERS.get(intent.get_standard_name())
+    if previous is None or previous.version != retriever.version:
+        NEIGHBORS_CACHE.invalidate(intent.get_standard_name())
+        RESPONSE_CACHE.invalidate(intent.name)
+    RETRIEVERS[intent.get_standard_name()] = retriever
 
-        if INTENTS_HASH != new_hash:
-            for intent in intents:
-                if not intent.gcp_bucket:
-                    continue
-                ixs = MatchingEngineIndexEndpoint.list(
-                    filter=f'display_name="{intent.get_standard_name()}"',
+
+def load_intent_indexes(intents: List[Intent]):
+    """Resolves the retriever and chunk store of new or changed intents.
+
+    Registered as an intent registry listener, so endpoints, deployed
+    index ids and index names are looked up once per deployment change.
+    Intents whose index settings didn't change are left untouched.
+    """
+    with INDEXES_LOCK:
+        names = {intent.get_standard_name() for intent in intents}
+        for name in [name for name in LOADED_INTENTS if name not in names]:
+            del LOADED_INTENTS[name]
+            RETRIEVERS.pop(name, None)
+            CHUNK_STORES.pop(name, None)
+
+        for intent in intents:
+            name = intent.get_standard_name()
+            settings = index_settings(intent)
+            if LOADED_INTENTS.get(name) == settings:
+                continue
+            try:
+                retriever = (
+                    load_retriever(intent) if intent.gcp_bucket else None
                 )
-                if len(ixs) == 0:
-                    print(
-                        f"Intent {intent.name} is not yet initialized."
-                        "Please run load_indexes.py to create an index"
-                        "for the intent"
-                    )
-                    continue
-                INDEX_ENDPOINTS[intent.get_standard_name()] = ixs[0]
-                # Configure Vector Search client
-                INDEX_ENDPOINTS_CLIENTS[intent.get_standard_name()] = (
-                    MatchServiceClient(
-                        client_options={
-                            "api_endpoint": ixs[0].public_endpoint_domain_name,
-                        },
-                    )
+                chunk_store = ChunkStore.load(intent) if retriever else None
+            except Exception as e:
+                # Retried on the next change of the intents.
+                print(f"Error loading the index of {intent.name}: {e}")
+                continue
+            LOADED_INTENTS[name] = settings
+            if intent.gcp_bucket and not retriever:
+                print(
+                    f"Intent {intent.name} is not yet initialized."
+                    "Please run load_indexes.py to create an index"
+                    "for the intent"
                 )
-            INTENTS_HASH = new_hash
+            # Replaced in place, so requests never see a missing retriever
+            # while an intent is reloaded.
+            if retriever:
+                set_retriever(intent, retriever)
+            else:
+                RETRIEVERS.pop(name, None)
+            if chunk_store:
+                CHUNK_STORES[name] = chunk_store
+            else:
+                CHUNK_STORES.pop(name, None)
+
+
+class VertexAIService:
+
+    def __init__(self):
+        self.repository = BigQueryRepository()
+
+    def get_retriever(self, intent: Intent) -> Optional[Retriever]:
+        retriever = RETRIEVERS.get(intent.get_standard_name())
+        if retriever and retriever.is_stale():
+            retriever = load_retriever(intent) or retriever
+            set_retriever(intent, retriever)
+        return retriever
+
+    def get_chunk_store(self, intent: Intent) -> Optional[ChunkStore]:
+        chunk_store = CHUNK_STORES.get(intent.get_standard_name())
+        if chunk_store and chunk_store.is_stale():
+            chunk_store = ChunkStore.load(intent) or chunk_store
+            CHUNK_STORES[intent.get_standard_name()] = chunk_store
+        return chunk_store
 
     def vector_search_query(
         self,
-        index_endpoint: MatchingEngineIndexEndpoint,
-        match_service_client: MatchServiceClient,
-        question: str,
-    ) -> MutableSequence[FindNeighborsResponse.Neighbor]:
-        # Build FindNeighborsRequest object
-        datapoint = IndexDatapoint(
-            feature_vector=EMBEDDINGS_MODEL.embed_query(question)
-        )
+        intent: Intent,
+        retriever: Retriever,
+        embedding: List[float],
+    ) -> List[str]:
+        key = embedding_cache_key(embedding)
+        neighbors = NEIGHBORS_CACHE.get(intent.get_standard_name(), key)
+        if neighbors is None:
+            neighbors = retriever.search(embedding, CONTEXT_NEIGHBORS)
+            NEIGHBORS_CACHE.set(intent.get_standard_name(), key, neighbors)
+        return neighbors
 
-        query = FindNeighborsRequest.Query(
-            datapoint=datapoint, neighbor_count=3
-        )
+    def get_chunk_texts(
+        self, intent: Intent, chunk_ids: List[str], index_name: str
+    ) -> List[str]:
+        """Resolves chunk ids to their text, in the order of the ids.
 
-        return (
-            match_service_client.find_neighbors(
-                FindNeighborsRequest(
-                    index_endpoint=index_endpoint.resource_name,
-                    deployed_index_id=index_endpoint.deployed_indexes[0].id,
-                    # Request can have multiple queries
-                    queries=[query],
-                    return_full_datapoint=False,
-                )
+        Texts come from the chunk text cache, then from the intent chunk
+        store when it matches the index, and from BigQuery for the ids
+        neither has.
+        """
+        texts = CHUNK_TEXT_CACHE.get_many(index_name, chunk_ids)
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in texts]
+        chunk_store = self.get_chunk_store(intent)
+        if missing and chunk_store and chunk_store.index_name == index_name:
+            try:
+                texts.update(chunk_store.get_texts(missing))
+            except sqlite3.Error as e:
+                print(f"Error reading chunk store: {e}")
+        fetched = {
+            chunk_id: texts[chunk_id]
+            for chunk_id in missing
+            if chunk_id in texts
+        }
+        missing = [chunk_id for chunk_id in missing if chunk_id not in texts]
+        if missing:
+            fetched.update(
+                self.get_text_results_from_bigquery(missing, index_name)
             )
-            .nearest_neighbors[0]
-            .neighbors
-        )
-
-    def get_index_name(
-        self, index_endpoint: MatchingEngineIndexEndpoint
-    ) -> str:
-        return MatchingEngineIndex(
-            index_endpoint.deployed_indexes[0].index
-        ).display_name
+        CHUNK_TEXT_CACHE.set_many(index_name, fetched)
+        texts.update(fetched)
+        return [texts[chunk_id] for chunk_id in chunk_ids if chunk_id in texts]
 
     def get_text_results_from_bigquery(
         self, chunk_ids: List[str], index_name: str
-    ):
+    ) -> Dict[str, str]:
         if not chunk_ids:
-            return []
+            return {}
         query = f"""
             SELECT text, id
              FROM `{BIG_QUERY_DATASET}.{EMBEDDINGS_TABLE}`
-             WHERE id IN {str(chunk_ids).replace("[", "(").replace("]", ")")}
-             AND index = "{index_name}";
+             WHERE id IN UNNEST(@ids)
+             AND index = @index;
         """
 
-        rows = self.client.query(query).result()
-        texts = []
+        rows = self.repository.run_query(
+            query,
+            {"ids": chunk_ids, "index": index_name},
+            label="chunk_texts",
+        )
+        texts = {}
 
         for row in rows:
-            texts.append(row[0])
+            texts[row[1]] = row[0]
         return texts
 
     def generate_llm_response(
@@ -138,8 +244,20 @@ class VertexAIService:
         question: str,
         temperature: float,
     ) -> str:
+        return "".join(
+            self.stream_llm_response(
+                model, prompt, chunked_context, question, temperature
+            )
+        )
 
-        response_list = []
+    def stream_llm_response(
+        self,
+        model: GenerativeModel,
+        prompt: str,
+        chunked_context,
+        question: str,
+        temperature: float,
+    ) -> Iterator[str]:
         context = ""
         for ix, data in enumerate(chunked_context):
             context += f"Context {ix + 1}: {data} \n"
@@ -157,14 +275,16 @@ class VertexAIService:
         )
         for response in responses:
             if response.candidates[0].content.parts:
-                response_list.append(response.text)
-
-        return "".join(response_list)
+                yield response.text
 
     def generate_out_of_context_response(
         self, model: GenerativeModel, question: str
     ) -> str:
-        response_list = []
+        return "".join(self.stream_out_of_context_response(model, question))
+
+    def stream_out_of_context_response(
+        self, model: GenerativeModel, question: str
+    ) -> Iterator[str]:
         prompt = f"""
         You are a friendly conversational bot called. Whenever you are asked a question follow this instructions.
         1. Reply that you don't have an answer for the following question given your knowledge and the context provided in the question.
@@ -185,14 +305,13 @@ class VertexAIService:
         )
         for response in responses:
             if response.candidates[0].content.parts:
-                response_list.append(response.text)
-
-        return "".join(response_list)
+                yield response.text
 
     def generate_text_from_model(
         self,
         query: str,
         intent: Intent,
+        query_embedding: Optional[List[float]] = None,
     ) -> str:
         """
         Given a user query, and an inferred intent
@@ -201,38 +320,99 @@ class VertexAIService:
         finaly generate an LLM response out of it
         @param query: The user's query
         @param intent: The user's inferred intent
+        @param query_embedding: The query embedding, if already computed
         @return LLM response: The LLM generated response
         """
+        return "".join(
+            self.stream_text_from_model(query, intent, query_embedding)
+        )
+
+    def stream_text_from_model(
+        self,
+        query: str,
+        intent: Intent,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Iterator[str]:
+        """
+        Same as generate_text_from_model, but yields the
+        parts of the LLM response as the model produces them.
+        Answers to questions similar to a previous one of
+        the same intent are served from the response cache
+        @param query: The user's query
+        @param intent: The user's inferred intent
+        @param query_embedding: The query embedding, if already computed
+        @return Iterator over the LLM generated response parts
+        """
+        embedding = query_embedding or QUERY_EMBEDDINGS.embed_query(query)
+        cached_answer = RESPONSE_CACHE.lookup(intent, embedding)
+        if cached_answer is not None:
+            return iter([cached_answer])
+        parts, cacheable = self.generate_response_stream(
+            query, intent, embedding
+        )
+        if not cacheable:
+            return parts
+        return self.cache_response(intent, embedding, parts)
+
+    def cache_response(
+        self, intent: Intent, embedding: List[float], parts: Iterator[str]
+    ) -> Iterator[str]:
+        """Yields the response parts, caching the answer once complete."""
+        answer = []
+        for part in parts:
+            answer.append(part)
+            yield part
+        if answer:
+            RESPONSE_CACHE.store(intent, embedding, "".join(answer))
+
+    def generate_response_stream(
+        self, query: str, intent: Intent, embedding: List[float]
+    ) -> Tuple[Iterator[str], bool]:
+        """Starts the generation of the answer to a query.
+
+        Returns the answer parts, and whether the answer can be cached. The
+        out of context fallback, used while an intent isn't indexed or when
+        nothing relevant is found, is never cached, so similar questions
+        get a grounded answer as soon as one is possible.
+        """
         model = GenerativeModel(intent.ai_model)
         if intent.gcp_bucket:
-            index_endpoint = INDEX_ENDPOINTS[intent.get_standard_name()]
-            match_engine_client = INDEX_ENDPOINTS_CLIENTS[
-                intent.get_standard_name()
-            ]
-            similarity_results = self.vector_search_query(
-                index_endpoint,
-                match_engine_client,
-                query,
+            # Intents whose index isn't deployed yet have no retriever.
+            retriever = self.get_retriever(intent)
+            similarity_results = (
+                self.vector_search_query(intent, retriever, embedding)
+                if retriever
+                else []
             )
             if similarity_results:
-                context = self.get_text_results_from_bigquery(
-                    [res.datapoint.datapoint_id for res in similarity_results],
-                    self.get_index_name(index_endpoint),
+                context = self.get_chunk_texts(
+                    intent,
+                    similarity_results,
+                    retriever.index_name,
                 )
-                return self.generate_llm_response(
-                    model,
-                    intent.prompt,
-                    context,
-                    query,
-                    intent.ai_temperature,
+                return (
+                    self.stream_llm_response(
+                        model,
+                        intent.prompt,
+                        context,
+                        query,
+                        intent.ai_temperature,
+                    ),
+                    bool(context),
                 )
             else:
-                return self.generate_out_of_context_response(model, query)
+                return (
+                    self.stream_out_of_context_response(model, query),
+                    False,
+                )
         else:
-            return self.generate_llm_response(
-                model,
-                intent.prompt,
-                [],
-                query,
-                1,
+            return (
+                self.stream_llm_response(
+                    model,
+                    intent.prompt,
+                    [],
+                    query,
+                    1,
+                ),
+                True,
             )
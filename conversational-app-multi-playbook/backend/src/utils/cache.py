@@ -0,0 +1,278 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded caches for the chat pipeline, with hit and miss counters.
+
+A Cache stores JSON serializable values in a pluggable backend. The default
+MemoryBackend is an in-process LRU bounded by the total size of its
+entries. When CACHE_REDIS_URL is set, caches share a Redis instance
+instead, so every Cloud Run instance benefits from the others' entries.
+
+Entries are grouped by scope (e.g. an intent). Invalidating a scope bumps
+its generation, which is part of every key, so stale entries are never
+read again and age out of the LRU or expire in Redis.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from json import dumps, loads
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import redis
+except ImportError:  # Optional, only needed for a shared cache.
+    redis = None
+
+CACHE_REDIS_URL = getenv("CACHE_REDIS_URL", "")
+
+
+class CacheBackend(ABC):
+    """Stores serialized cache entries."""
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Returns the value of each key, or None for missing keys."""
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, str], ttl_seconds: Optional[int]):
+        """Stores the items, expiring them after `ttl_seconds` if set."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increments a counter and returns its new value."""
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        """Returns the value of a counter, zero if it was never set."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns backend specific counters."""
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe LRU bounded by the total size of its entries.
+
+    Attributes:
+        max_bytes: Maximum total size of the stored keys and values. The
+                   least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initializes an empty cache."""
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._bytes = 0
+        self._evictions = 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        now = monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                    continue
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    self._remove(key)
+                    values.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                values.append(value)
+        return values
+
+    def set_many(self, items: Dict[str, str], ttl_seconds: Optional[int]):
+        expires_at = monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            for key, value in items.items():
+                size = len(key) + len(value)
+                if size > self.max_bytes:
+                    continue
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (value, expires_at)
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+
+class RedisBackend(CacheBackend):
+    """Shares cache entries between instances through Redis.
+
+    Size is bounded by the Redis maxmemory and eviction policy, which
+    should be an LRU one such as allkeys-lru.
+    """
+
+    def __init__(self, url: str):
+        """Connects to the Redis instance at `url`."""
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self.client.mget(keys) if keys else []
+
+    def set_many(self, items: Dict[str, str], ttl_seconds: Optional[int]):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(key, value, ex=ttl_seconds)
+        pipeline.execute()
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+    def get_counter(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+
+class Cache:
+    """A namespace of cached values, with hit and miss counters.
+
+    Attributes:
+        namespace: Prefix of every key of this cache in the backend.
+        backend: Where entries are stored.
+        ttl_seconds: Lifetime of the entries, or None to keep them until
+                     they are evicted.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        backend: CacheBackend,
+        ttl_seconds: Optional[int] = None,
+    ):
+        """Initializes the cache and its counters."""
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    def get_many(self, scope: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Returns the cached values of the keys found in a scope."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            prefix = self._prefix(scope)
+            values = self.backend.get_many([f"{prefix}{key}" for key in keys])
+        except Exception as e:
+            # The cache is an optimization, never fail the request on it.
+            self._count_error(e)
+            values = [None] * len(keys)
+
+        found = {
+            key: loads(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        """Returns the cached value of a key, or None if it is missing."""
+        return self.get_many(scope, [key]).get(key)
+
+    def set_many(self, scope: str, items: Dict[str, Any]):
+        """Caches the items in a scope."""
+        if not items:
+            return
+        try:
+            prefix = self._prefix(scope)
+            self.backend.set_many(
+                {
+                    f"{prefix}{key}": dumps(value)
+                    for key, value in items.items()
+                },
+                self.ttl_seconds,
+            )
+        except Exception as e:
+            self._count_error(e)
+
+    def set(self, scope: str, key: str, value: Any):
+        """Caches a value in a scope."""
+        self.set_many(scope, {key: value})
+
+    def invalidate(self, scope: str):
+        """Makes every entry cached so far in a scope unreachable."""
+        try:
+            self.backend.incr(self._generation_key(scope))
+        except Exception as e:
+            self._count_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                **self.backend.stats(),
+            }
+
+    def _prefix(self, scope: str) -> str:
+        generation = self.backend.get_counter(self._generation_key(scope))
+        return f"{self.namespace}:{scope}:{generation}:"
+
+    def _generation_key(self, scope: str) -> str:
+        return f"{self.namespace}:{scope}:generation"
+
+    def _count_error(self, error: Exception):
+        print(f"Error accessing the {self.namespace} cache: {error}")
+        with self._lock:
+            self._errors += 1
+
+
+def create_cache(
+    namespace: str, max_bytes: int, ttl_seconds: Optional[int] = None
+) -> Cache:
+    """Creates a cache on Redis if CACHE_REDIS_URL is set, else in memory."""
+    if CACHE_REDIS_URL:
+        if redis is None:
+            raise ValueError("CACHE_REDIS_URL is set but redis isn't installed")
+        return Cache(namespace, RedisBackend(CACHE_REDIS_URL), ttl_seconds)
+    return Cache(namespace, MemoryBackend(max_bytes), ttl_seconds)
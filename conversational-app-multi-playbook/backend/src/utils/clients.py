@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Application scoped Google Cloud clients.
+
+Creating a client discovers the default credentials and opens a new
+HTTP or gRPC channel, whose first call pays a TLS handshake and a token
+fetch. ClientProvider creates each client once per process, from a single
+set of credentials, so every request reuses warm channels and one auth
+session. The clients are thread-safe and shared by all requests.
+
+The app lifespan warms the clients up at startup and closes them on
+shutdown. Routes receive them through FastAPI dependencies, e.g.
+`client: SpeechClient = Depends(get_speech_client)`, while repositories
+read them from CLIENTS.
+"""
+
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google.auth
+from google.auth.credentials import Credentials
+from google.cloud import bigquery, speech, storage
+from google.cloud.tasks_v2 import CloudTasksClient
+
+
+class ClientProvider:
+    """Lazily creates and caches one instance of each client."""
+
+    def __init__(self):
+        """Initializes an empty provider."""
+        self._lock = Lock()
+        self._auth: Optional[Tuple[Credentials, Optional[str]]] = None
+        self._clients: Dict[str, Any] = {}
+
+    def bigquery(self) -> bigquery.Client:
+        """Returns the shared BigQuery client."""
+        return self._get(
+            "bigquery",
+            lambda credentials, project: bigquery.Client(
+                project=project, credentials=credentials
+            ),
+        )
+
+    def storage(self) -> storage.Client:
+        """Returns the shared Cloud Storage client."""
+        return self._get(
+            "storage",
+            lambda credentials, project: storage.Client(
+                project=project, credentials=credentials
+            ),
+        )
+
+    def tasks(self) -> CloudTasksClient:
+        """Returns the shared Cloud Tasks client."""
+        return self._get(
+            "tasks",
+            lambda credentials, _: CloudTasksClient(credentials=credentials),
+        )
+
+    def speech(self) -> speech.SpeechClient:
+        """Returns the shared Speech-to-Text client."""
+        return self._get(
+            "speech",
+            lambda credentials, _: speech.SpeechClient(credentials=credentials),
+        )
+
+    def project_id(self) -> Optional[str]:
+        """Returns the project of the default credentials."""
+        return self._credentials()[1]
+
+    def warm_up(self):
+        """Creates every client ahead of the first request."""
+        self.bigquery()
+        self.storage()
+        self.tasks()
+        self.speech()
+
+    def close(self):
+        """Closes the channels of the clients created so far."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            # HTTP clients have close(), gRPC ones close their transport.
+            close = getattr(client, "close", None) or getattr(
+                getattr(client, "transport", None), "close", None
+            )
+            try:
+                if close:
+                    close()
+            except Exception as e:
+                print(f"Error closing {type(client).__name__}: {e}")
+
+    def _get(
+        self,
+        name: str,
+        factory: Callable[[Credentials, Optional[str]], Any],
+    ) -> Any:
+        client = self._clients.get(name)
+        if client is None:
+            credentials, project = self._credentials()
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = factory(credentials, project)
+                    self._clients[name] = client
+        return client
+
+    def _credentials(self) -> Tuple[Credentials, Optional[str]]:
+        with self._lock:
+            if self._auth is None:
+                self._auth = google.auth.default(
+                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
+                )
+            return self._auth
+
+
+CLIENTS = ClientProvider()
+
+
+def get_clients() -> ClientProvider:
+    """FastAPI dependency returning the application client provider."""
+    return CLIENTS
+
+
+def get_speech_client() -> speech.SpeechClient:
+    """FastAPI dependency returning the shared Speech-to-Text client."""
+    return CLIENTS.speech()
@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memoization of query embeddings.
+
+Several steps of a chat turn need the embedding of the same user text, and
+popular questions are asked again and again. QueryEmbeddingMemo embeds
+each distinct text once: a request scoped memo guarantees it within a
+turn, and a bounded process wide LRU shares embeddings across turns.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from os import getenv
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from langchain_google_vertexai import VertexAIEmbeddings
+from numpy import asarray, float32, ndarray
+
+# A 768 dimension float32 embedding takes 3 KiB, about 12 MiB in total.
+QUERY_EMBEDDING_MEMO_MAX_ENTRIES = int(
+    getenv("QUERY_EMBEDDING_MEMO_MAX_ENTRIES", "4096")
+)
+
+MemoKey = Tuple[str, str]
+
+_REQUEST_MEMO: ContextVar[Optional[Dict[MemoKey, ndarray]]] = ContextVar(
+    "request_query_embeddings", default=None
+)
+
+
+class QueryEmbeddingMemo:
+    """Embeds query texts at most once per process and per request.
+
+    Entries are keyed by the model name and the SHA-256 hash of the text,
+    so the memo never returns an embedding from another model.
+
+    Attributes:
+        model: The embeddings model used on a miss.
+        model_name: The name of the model, part of every key.
+        max_entries: Maximum number of embeddings kept by the process wide
+                     LRU. Zero disables it, leaving only the request memo.
+    """
+
+    def __init__(
+        self,
+        model: VertexAIEmbeddings,
+        model_name: str,
+        max_entries: int = QUERY_EMBEDDING_MEMO_MAX_ENTRIES,
+    ):
+        """Initializes an empty memo."""
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        """Returns the query embedding of a text, computing it on a miss."""
+        key = (self.model_name, sha256(text.encode()).hexdigest())
+        request_memo = _REQUEST_MEMO.get()
+
+        embedding = request_memo.get(key) if request_memo is not None else None
+        if embedding is None:
+            with self._lock:
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+        if embedding is not None:
+            with self._lock:
+                self._hits += 1
+        else:
+            embedding = asarray(self.model.embed_query(text), dtype=float32)
+            with self._lock:
+                self._misses += 1
+                if self.max_entries > 0:
+                    self._entries[key] = embedding
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        if request_memo is not None:
+            request_memo[key] = embedding
+        return embedding.tolist()
+
+    @contextmanager
+    def request_scope(self) -> Iterator[None]:
+        """Shares embeddings between the calls made within the block."""
+        token = _REQUEST_MEMO.set({})
+        try:
+            yield
+        finally:
+            _REQUEST_MEMO.reset(token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the memo counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded thread pool for running blocking calls from async handlers.
+
+The Google Cloud clients used by the chat pipeline (BigQuery, Vertex AI
+embeddings, Matching Engine and Gemini) are synchronous. Calling them
+directly from an `async def` route freezes the event loop, so every other
+connection on the worker stalls. BlockingExecutor runs those calls on a
+dedicated, bounded thread pool and keeps counters to size it.
+"""
+
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from os import getenv
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+CHAT_EXECUTOR_MAX_WORKERS = int(getenv("CHAT_EXECUTOR_MAX_WORKERS", "16"))
+
+
+class BlockingExecutor:
+    """Runs blocking callables on a bounded, instrumented thread pool.
+
+    Attributes:
+        max_workers: Maximum number of calls running at the same time.
+                     Further calls wait in the pool queue.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        """Initializes the thread pool and its counters."""
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self._lock = Lock()
+        self._submitted = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs `func(*args, **kwargs)` on the pool and awaits its result.
+
+        The caller's context variables are propagated to the worker thread,
+        like `asyncio.to_thread` does.
+        """
+        submitted_at = perf_counter()
+        with self._lock:
+            self._submitted += 1
+
+        def call():
+            started_at = perf_counter()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._failed += failed
+                    self._run_seconds += perf_counter() - started_at
+
+        return await get_running_loop().run_in_executor(
+            self._executor, partial(copy_context().run, call)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the pool counters."""
+        with self._lock:
+            started = (self._completed + self._running) or 1
+            completed = self._completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self._submitted,
+                "running": self._running,
+                "queued": self._submitted - self._completed - self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": 1000 * self._wait_seconds / started,
+                "max_wait_ms": 1000 * self._max_wait_seconds,
+                "avg_run_ms": 1000 * self._run_seconds / completed,
+            }
+
+    def shutdown(self):
+        """Waits for the running calls and releases the pool threads."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+CHAT_EXECUTOR = BlockingExecutor(CHAT_EXECUTOR_MAX_WORKERS, "chat")
@@ -24,6 +24,19 @@ def intents_to_json(intents: List[Intent]):
     return dumps(dictionaries, sort_keys=True)
 
 
+def intent_questions_to_json(intents: List[Intent]):
+    """Converts the name and questions of each intent to a JSON string.
+
+    Only the fields that feed the question embeddings are included, so the
+    resulting fingerprint changes only when an intent's questions change.
+    """
+    dictionaries = [
+        {"name": intent.name, "questions": intent.questions}
+        for intent in intents
+    ]
+    return dumps(dictionaries, sort_keys=True)
+
+
 def generate_hash(data):
     """Generates a SHA-256 hash of the input data."""
     hash_object = sha256(data.encode())
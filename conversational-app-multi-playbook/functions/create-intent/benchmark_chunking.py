@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares serial and process pool chunking on a local directory of PDFs.
+
+    python3 benchmark_chunking.py path/to/pdfs --workers 4
+"""
+
+from argparse import ArgumentParser
+from os import cpu_count
+from pathlib import Path
+from time import perf_counter
+
+from src.chunk import split_sources
+
+
+def run(paths, max_workers):
+    sources = [(str(path), path.read_bytes) for path in paths]
+    started_at = perf_counter()
+    records = list(split_sources(sources, max_workers))
+    return records, perf_counter() - started_at
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark PDF chunking")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.directory).glob("**/*.pdf"))
+    print(f"{len(paths)} PDF files in {args.directory}")
+
+    serial, serial_time = run(paths, 1)
+    print(f"serial: {len(serial)} chunks in {serial_time:.2f}s")
+
+    parallel, parallel_time = run(paths, args.workers)
+    print(f"{args.workers} workers: {len(parallel)} chunks in {parallel_time:.2f}s")
+
+    assert parallel == serial, "parallel chunking changed the output"
+    print(f"speedup: {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
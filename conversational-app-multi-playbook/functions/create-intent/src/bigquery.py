@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from typing import Dict, List
-from google.cloud.bigquery import Client
+from google.cloud.bigquery import ArrayQueryParameter, Client, LoadJobConfig, QueryJobConfig, ScalarQueryParameter, WriteDisposition
 import logging
 
 from src.models import Embedding
@@ -47,13 +47,33 @@ class BigQueryRepository:
         return self.run_query(query)
 
     def insert_rows(self, table_id: str, embeddings: List[Embedding]):
+        # A load job instead of streaming inserts: streamed rows can't be
+        # deleted for a while, which breaks incremental index updates.
         values = [embedding.to_dict() for embedding in embeddings]
-        errors = self.client.insert_rows(f"{BIG_QUERY_DATASET}.{table_id}", values, Embedding.__schema__())
-        if errors == []:
-            print("Embeddings added")
-        else:
-            print("Encountered errors while inserting rows: {}".format(errors))
-            raise(Exception("Error inserting embeddings in BQ"))
+        job_config = LoadJobConfig(
+            schema=Embedding.__schema__(),
+            write_disposition=WriteDisposition.WRITE_APPEND,
+        )
+        job = self.client.load_table_from_json(values, f"{BIG_QUERY_DATASET}.{table_id}", job_config=job_config)
+        try:
+            job.result()
+        except Exception as e:
+            print("Encountered errors while inserting rows: {}".format(job.errors))
+            raise(Exception("Error inserting embeddings in BQ")) from e
+        print(f"{len(values)} embeddings added")
+
+    def delete_embeddings(self, index_name: str, ids: List[str]):
+        query = f"""
+            DELETE FROM `{BIG_QUERY_DATASET}.{EMBEDDINGS_TABLE}`
+            WHERE `{EMBEDDINGS_INDEX_COLUMN}` = @index_name
+            AND {EMBEDDINGS_ID_COLUMN} IN UNNEST(@ids)
+            """
+        job_config = QueryJobConfig(query_parameters=[
+            ScalarQueryParameter("index_name", "STRING", index_name),
+            ArrayQueryParameter("ids", "STRING", ids),
+        ])
+        logging.info(query)
+        return self.client.query(query, job_config=job_config).result()
 
     def update_intent_status(self, intent_name: str, intent_status: str):
         query = f"""
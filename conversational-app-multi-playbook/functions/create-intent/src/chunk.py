@@ -12,31 +12,94 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
-from langchain_google_community.gcs_directory import GCSDirectoryLoader
-from langchain_community.document_loaders.pdf import PDFMinerLoader
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+from os import cpu_count
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from google.cloud.storage import Blob, Client
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pdfminer.high_level import extract_text
 
 CHUNKER = RecursiveCharacterTextSplitter(
     chunk_size=1000,
     chunk_overlap=200,
 )
 
+# A source is a document name and a callable returning its raw bytes.
+Source = Tuple[str, Callable[[], bytes]]
+# A record is the document name, the chunk position within it and its text.
+Record = Tuple[str, int, str]
+
+
+def parse_and_split(data: bytes) -> List[str]:
+    # Same text as PDFMinerLoader, which extracts the concatenated pages.
+    return CHUNKER.split_text(extract_text(BytesIO(data)))
+
+
+def split_sources(sources: Iterable[Source], max_workers: int) -> Iterator[Record]:
+    """Parses and splits documents, yielding records in source order.
+
+    With more than one worker, documents are downloaded concurrently on a
+    thread pool and parsed on a process pool, since PDFMiner is CPU bound
+    pure Python. At most two documents per worker are in flight.
+    """
+    if max_workers <= 1:
+        for source, read in sources:
+            for chunk_index, text in enumerate(parse_and_split(read())):
+                yield source, chunk_index, text
+        return
+
+    sources = iter(sources)
+    pending = deque()
+    # Workers are spawned, not forked: the function has already opened gRPC
+    # and Storage clients, which are not fork-safe.
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as parsers, \
+            ThreadPoolExecutor(max_workers=2 * max_workers) as downloads:
+
+        def download_and_parse(read: Callable[[], bytes]) -> List[str]:
+            return parsers.submit(parse_and_split, read()).result()
+
+        while True:
+            while len(pending) < 2 * max_workers:
+                source = next(sources, None)
+                if source is None:
+                    break
+                name, read = source
+                pending.append((name, downloads.submit(download_and_parse, read)))
+            if not pending:
+                break
+
+            name, future = pending.popleft()
+            for chunk_index, text in enumerate(future.result()):
+                yield name, chunk_index, text
+
+
 class ChunkService:
 
-    def __init__(self, project_name:str, full_path: str):
-        bucket = full_path.split("/")[2]
-        prefix = full_path.replace(f"gs://{bucket}/", "")
-
-        self.loader = GCSDirectoryLoader(
-            project_name=project_name,
-            bucket=bucket,
-            prefix=prefix,
-            loader_func=PDFMinerLoader
-        )
-
-    def generate_chunks(self) -> List[str]:
-        chunks = []
-        for doc in self.loader.load():
-            chunks.extend([chunk.page_content for chunk in CHUNKER.split_documents([doc])])
-        return chunks
\ No newline at end of file
+    def __init__(self, project_name:str, full_path: str, max_workers: Optional[int] = None):
+        self.project_name = project_name
+        self.bucket = full_path.split("/")[2]
+        self.prefix = full_path.replace(f"gs://{self.bucket}/", "")
+        self.max_workers = max_workers or cpu_count() or 1
+
+    def list_blobs(self) -> List[Blob]:
+        client = Client(project=self.project_name)
+        return [
+            blob for blob in client.list_blobs(self.bucket, prefix=self.prefix)
+            if not blob.name.endswith("/")
+        ]
+
+    def source_name(self, blob: Blob) -> str:
+        return f"gs://{self.bucket}/{blob.name}"
+
+    def generate_records(self, blobs: Optional[Iterable[Blob]] = None) -> Iterator[Record]:
+        if blobs is None:
+            blobs = self.list_blobs()
+        sources = ((self.source_name(blob), blob.download_as_bytes) for blob in blobs)
+        return split_sources(sources, self.max_workers)
+
+    def generate_chunks(self) -> Iterator[str]:
+        for _, _, text in self.generate_records():
+            yield text
@@ -0,0 +1,46 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+from typing import Iterable, Tuple
+
+
+class ChunkStore:
+    """SQLite file mapping the datapoint ids of an index to their text.
+
+    The backend downloads it next to the vector index to resolve neighbors
+    without a BigQuery query. BigQuery stays the system of record.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+
+    def set_index_name(self, index_name: str):
+        self.connection.execute("INSERT OR REPLACE INTO metadata VALUES ('index_name', ?)", (index_name,))
+
+    def add(self, chunks: Iterable[Tuple[str, str]]):
+        self.connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?)", chunks)
+
+    def remove(self, ids: Iterable[str]):
+        self.connection.executemany("DELETE FROM chunks WHERE id = ?", ((doc_id,) for doc_id in ids))
+
+    def close(self):
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+        self.connection.close()
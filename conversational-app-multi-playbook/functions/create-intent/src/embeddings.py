@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from random import uniform
+from time import monotonic, sleep
+from typing import Callable, Iterable, Iterator, List, Tuple, TypeVar
+from google.api_core.exceptions import (
+    ResourceExhausted,
+    ServiceUnavailable,
+    TooManyRequests,
+)
+from langchain_google_vertexai import VertexAIEmbeddings
+
+# 1000 character chunks stay well below the per request token limit of the
+# embeddings API with this many instances per call.
+EMBEDDINGS_BATCH_SIZE = 25
+EMBEDDINGS_MAX_CONCURRENT_BATCHES = 4
+EMBEDDINGS_MAX_RETRIES = 6
+EMBEDDINGS_INITIAL_BACKOFF_SECONDS = 2
+EMBEDDINGS_PROGRESS_EVERY = 500
+
+RETRYABLE_ERRORS = (ResourceExhausted, ServiceUnavailable, TooManyRequests)
+
+T = TypeVar("T")
+
+
+class EmbeddingService:
+    """Embeds chunks in API sized batches, several batches at a time."""
+
+    def __init__(
+        self,
+        model: VertexAIEmbeddings,
+        batch_size: int = EMBEDDINGS_BATCH_SIZE,
+        max_concurrent_batches: int = EMBEDDINGS_MAX_CONCURRENT_BATCHES,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+
+    def embed(
+        self,
+        chunks: Iterable[T],
+        get_text: Callable[[T], str] = str,
+    ) -> Iterator[Tuple[T, List[float]]]:
+        """Yields (chunk, embedding) pairs in the order of the input chunks.
+
+        Chunks are consumed lazily, and at most `max_concurrent_batches`
+        batches are in flight at any time. Chunks can be any object, in
+        which case `get_text` returns the text to embed.
+        """
+        chunks = iter(chunks)
+        pending = deque()
+        embedded = 0
+        next_progress = EMBEDDINGS_PROGRESS_EVERY
+        started_at = monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_batches) as executor:
+            while True:
+                while len(pending) < self.max_concurrent_batches:
+                    batch = list(islice(chunks, self.batch_size))
+                    if not batch:
+                        break
+                    texts = [get_text(chunk) for chunk in batch]
+                    pending.append((batch, executor.submit(self._embed_batch, texts)))
+                if not pending:
+                    break
+
+                batch, future = pending.popleft()
+                yield from zip(batch, future.result())
+
+                embedded += len(batch)
+                if embedded >= next_progress:
+                    elapsed = monotonic() - started_at
+                    print(f"Embedded {embedded} chunks in {elapsed:.0f}s")
+                    next_progress += EMBEDDINGS_PROGRESS_EVERY
+
+        print(f"Embedded {embedded} chunks in {monotonic() - started_at:.0f}s")
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        backoff = EMBEDDINGS_INITIAL_BACKOFF_SECONDS
+        for attempt in range(EMBEDDINGS_MAX_RETRIES + 1):
+            try:
+                return self.model.embed_documents(batch, batch_size=len(batch))
+            except RETRYABLE_ERRORS as e:
+                if attempt == EMBEDDINGS_MAX_RETRIES:
+                    raise
+                delay = uniform(backoff / 2, backoff)
+                print(f"Embeddings quota error, retrying in {delay:.1f}s: {e}")
+                sleep(delay)
+                backoff *= 2
@@ -14,7 +14,7 @@
 
 from google.cloud.bigquery import SchemaField
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 
 
 class Intent(BaseModel):
@@ -86,4 +86,20 @@ class Embedding(BaseModel):
             "index": self.index,
             "author": self.author,
             "timestamp": self.timestamp,
-        }
\ No newline at end of file
+        }
+
+
+class SourceManifest(BaseModel):
+    hash: str
+    chunks: List[str] = []
+
+
+class IndexManifest(BaseModel):
+    """What an intent index was built from, used for incremental updates.
+
+    Sources are keyed by their gs:// URI, with the MD5 hash GCS reports for
+    the blob and the ids of the chunks it produced.
+    """
+    index_resource: str = ""
+    index_name: str
+    sources: Dict[str, SourceManifest] = {}
@@ -21,16 +21,25 @@ the environment, defines root and version endpoints, includes API routers
 transcription using Google Cloud Speech-to-Text.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from src.controller.chats import router as chat_router
 from src.controller.intents import router as intent_router
 from src.controller.models import router as model_router
+from src.utils.executor import CHAT_EXECUTOR
 from google.cloud import speech
 from os import getenv
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Releases the chat executor threads on shutdown."""
+    yield
+    CHAT_EXECUTOR.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 def configure_cors(app):
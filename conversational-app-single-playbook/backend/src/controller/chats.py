@@ -19,6 +19,7 @@ from src.service.intent import IntentService
 from src.service.chats import ChatsService
 from src.service.intent_matching import IntentMatchingService
 from src.service.vertex_ai import VertexAIService
+from src.utils.executor import CHAT_EXECUTOR
 
 router = APIRouter(
     prefix="/api/chats",
@@ -27,39 +28,51 @@ router = APIRouter(
 )
 
 
-@router.post("")
-async def chat(
-    item: CreateChatRequest,
-    response: Response,
-    background_tasks: BackgroundTasks,
-):
+def answer_chat(text: str) -> Chat:
+    """Runs the blocking suggestion and generation pipeline."""
     intent_matching_service = IntentMatchingService()
     intents = IntentService().get_all()
     intent = intents[0]
 
     suggested_questions = intent_matching_service.get_suggested_questions(
-        item.text, intent
+        text, intent
     )
 
     model_response = VertexAIService(intents).generate_text_from_model(
-        item.text,
+        text,
         intent,
     )
 
-    final_response = Chat(
+    return Chat(
         id=str(uuid4()),
-        question=item.text,
+        question=text,
         answer=model_response,
         intent=intent.name,
         suggested_questions=suggested_questions,
     )
 
-    background_tasks.add_task(
-        ChatsService().insert_chat,
-        final_response,
-    )
+
+def insert_chat(chat: Chat):
+    ChatsService().insert_chat(chat)
+
+
+@router.post("")
+async def chat(
+    item: CreateChatRequest,
+    response: Response,
+    background_tasks: BackgroundTasks,
+):
+    final_response = await CHAT_EXECUTOR.run(answer_chat, item.text)
+
+    background_tasks.add_task(insert_chat, final_response)
 
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return final_response
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Returns the counters of the chat pipeline executor."""
+    return {"executor": CHAT_EXECUTOR.stats()}
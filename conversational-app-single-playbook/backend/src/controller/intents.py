@@ -91,6 +91,29 @@ async def delete_intent(intent_name: str):
     return
 
 
+@router.post("/{intent_name}/reindex")
+async def reindex_intent(intent_name: str):
+    intent = IntentService().get(intent_name)
+    if not intent:
+        raise HTTPException(status_code=404, detail="Intent not found")
+    if not intent.gcp_bucket:
+        raise HTTPException(
+            status_code=400, detail="Intent has no GCP bucket to index"
+        )
+
+    index_endpoint = IndexEndpointService().get_endpoint(
+        intent.get_standard_name()
+    )
+    TaskRepository().create(
+        IntentCreateEvent(
+            intent_name=intent.name,
+            index_endpoint_resource=index_endpoint.resource_name,
+            mode="incremental",
+        ),
+    )
+    return
+
+
 @router.put("/{intent_name}")
 async def update_intent(intent_name: str, intent: Intent):
     service = IntentService()
@@ -33,10 +33,14 @@ class IntentCreateEvent(BaseModel):
         index_endpoint_resource: The full resource name of the Vertex AI
                                  Matching Engine Index Endpoint associated
                                  with this intent.
+        mode: "full" to build a new index from every document of the intent
+              bucket, or "incremental" to apply only the documents that
+              changed since the last build to the existing index.
     """
 
     intent_name: str
     index_endpoint_resource: str
+    mode: str = "full"
 
     def to_dict(self):
         """Serializes the event data into a dictionary format.
@@ -50,4 +54,5 @@ class IntentCreateEvent(BaseModel):
         return {
             "intent_name": self.intent_name,
             "index_endpoint_resource": self.index_endpoint_resource,
+            "mode": self.mode,
         }
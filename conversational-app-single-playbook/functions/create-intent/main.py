@@ -13,15 +13,22 @@
 # limitations under the License.
 
 import json
+from hashlib import sha256
+from operator import itemgetter
+from os.path import join
+from tempfile import mkdtemp
 from uuid import uuid4
-from src.chunk import ChunkService
+from src.chunk import ChunkService, Record
 from langchain_google_vertexai import VertexAIEmbeddings
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from google.cloud.aiplatform import MatchingEngineIndexEndpoint, MatchingEngineIndex
+from google.cloud.aiplatform_v1 import IndexDatapoint
 from src.bigquery import EMBEDDINGS_TABLE, INTENTS_TABLE, INTENTS_TABLE_ID_COLUMN, BigQueryRepository
-from src.cloud_storage import EMBEDDINGS_FILE, EMBEDDINGS_FOLDER, CloudStorageRepository
-from src.models import Embedding, Intent
+from src.chunk_store import ChunkStore
+from src.cloud_storage import CHUNKS_CONTENT_TYPE, CHUNKS_FILE, CHUNKS_FOLDER, EMBEDDINGS_FILE, EMBEDDINGS_FOLDER, MANIFEST_FILE, MANIFESTS_FOLDER, CloudStorageRepository
+from src.embeddings import EmbeddingService
+from src.models import Embedding, IndexManifest, Intent, SourceManifest
 from flask import Request, jsonify
 from datetime import datetime
 from threading import Thread
@@ -29,12 +36,22 @@ from threading import Thread
 INDEX_DIMENSIONS=768
 INDEX_DISTANCE_MEASURE='DOT_PRODUCT_DISTANCE'
 INDEX_NEIGHBORS_COUNT=150
+# Stream updates let incremental builds upsert and remove datapoints in place.
+INDEX_UPDATE_METHOD='STREAM_UPDATE'
+INDEX_UPSERT_BATCH_SIZE=500
 
 TEXT_EMBEDDING_MODEL = "textembedding-gecko@003"
 EMBEDDINGS_MODEL = VertexAIEmbeddings(TEXT_EMBEDDING_MODEL)
 
 TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+# Text chunks are loaded to BigQuery in batches of this size, so memory
+# stays flat whatever the size of the corpus.
+EMBEDDINGS_INSERT_BATCH_SIZE = 10000
+
+FULL_MODE = "full"
+INCREMENTAL_MODE = "incremental"
+
 def create_intent_index(request: Request):
     if request.method != 'POST':
         return jsonify({'error': 'Method not allowed'}), 405
@@ -42,6 +59,7 @@ def create_intent_index(request: Request):
         request_json = request.get_json()
         intent_name = request_json.get('intent_name')
         index_resource = request_json.get('index_endpoint_resource')
+        mode = request_json.get('mode', FULL_MODE)
     except Exception as e:
         return jsonify({'error': 'Bad Request'}), 400
     
@@ -49,56 +67,78 @@ def create_intent_index(request: Request):
     big_query_repository = BigQueryRepository()
     gcs_repository = CloudStorageRepository(big_query_repository.client.project)
     
+    index = None
+    manifest = None
     try:        
         results = big_query_repository.get_row_by_id(INTENTS_TABLE, INTENTS_TABLE_ID_COLUMN, intent_name)
         intent = None
         for row in results:
             intent = Intent.__from_row__(row)
         
-        index_endpoint = MatchingEngineIndexEndpoint(index_resource)
+        # Intents searched in process by the backend have no endpoint.
+        index_endpoint = MatchingEngineIndexEndpoint(index_resource) if index_resource else None
 
         print(f"Everything has been corretly received")
 
-        index_embeddings = ""
         chunk_service = ChunkService(big_query_repository.client.project, intent.gcp_bucket)
+        embedding_service = EmbeddingService(EMBEDDINGS_MODEL)
+
+        if mode == INCREMENTAL_MODE:
+            manifest = load_manifest(gcs_repository, intent.name)
+            if manifest:
+                update_index(intent, manifest, chunk_service, embedding_service, gcs_repository, big_query_repository)
+                return jsonify({'message': 'JSON received and processed'}), 200
+            print(f"No manifest found for {intent.name}, running a full build")
+
         embeddings = []
-            
+        embeddings_count = 0
+
         index_unique_name = f"{intent.name.lower().replace(' ', '-').replace('_','-')}-{uuid4()}"
-        chunks = chunk_service.generate_chunks()
-
-        for index, chunk in enumerate(chunks):
-            embedding = create_embeddings(chunk)
-
-            if embedding is not None:
-                doc_id=f"{intent.name}-{index}.txt"
-                embeddings.append(Embedding(
-                    id=doc_id,
-                    text=chunk,
-                    index=index_unique_name,
-                    author="system",
-                    timestamp=datetime.now().strftime(TIME_FORMAT),
-                ))
-                index_embeddings += json.dumps({
-                    "id": doc_id,
-                    "embedding": [str(value) for value in embedding],
-                }) + "\n"
-        print(f"Embeddings created for {[e.id for e in embeddings]}")
+        blobs = chunk_service.list_blobs()
+        new_manifest = IndexManifest(
+            index_name=index_unique_name,
+            sources={chunk_service.source_name(blob): SourceManifest(hash=blob.md5_hash) for blob in blobs},
+        )
+        records = unique_records(intent.name, chunk_service.generate_records(blobs))
+        chunk_store = ChunkStore(join(mkdtemp(), CHUNKS_FILE))
+        chunk_store.set_index_name(index_unique_name)
+
         print(f"Uploading embeddings {intent.name}/{EMBEDDINGS_FILE}")
-        gcs_repository.create(f"{EMBEDDINGS_FOLDER}/{intent.name}/{EMBEDDINGS_FILE}", index_embeddings)
-            
+        with gcs_repository.open_writer(f"{EMBEDDINGS_FOLDER}/{intent.name}/{EMBEDDINGS_FILE}") as index_embeddings:
+            for (source, doc_id, chunk), embedding in embedding_service.embed(records, itemgetter(2)):
+                index_embeddings.write(to_index_datapoint(doc_id, embedding))
+                new_manifest.sources[source].chunks.append(doc_id)
+                embeddings.append(to_embedding(doc_id, chunk, index_unique_name))
+                embeddings_count += 1
+                if len(embeddings) >= EMBEDDINGS_INSERT_BATCH_SIZE:
+                    store_embeddings(big_query_repository, chunk_store, embeddings)
+                    embeddings = []
+        if embeddings:
+            store_embeddings(big_query_repository, chunk_store, embeddings)
+        print(f"{embeddings_count} embeddings created and uploaded")
+        upload_chunk_store(gcs_repository, intent.name, chunk_store)
+
+        if not index_endpoint:
+            save_manifest(gcs_repository, intent.name, new_manifest)
+            big_query_repository.update_intent_status(intent_name, "5")
+            return jsonify({'message': 'JSON received and processed'}), 200
+
         index = create_index(
             index_unique_name,
             intent.name,
             gcs_repository.bucket_name,
         )
+        new_manifest.index_resource = index.resource_name
+        save_manifest(gcs_repository, intent.name, new_manifest)
         big_query_repository.update_intent_status(intent_name, "3")
-        print("Uploading text chunks to bigquery...")
-        big_query_repository.insert_rows(EMBEDDINGS_TABLE, embeddings)
         Thread(target=deploy_index_endpoint, args=(index_endpoint, index)).start()
         return jsonify({'message': 'JSON received and processed'}), 200
 
     except Exception as e:
-        if index:
+        # A failed incremental update leaves the deployed index serving.
+        if manifest:
+            print(f"Incremental update of {intent_name} failed")
+        elif index:
             big_query_repository.update_intent_status(intent_name, "4")
         else:
             big_query_repository.update_intent_status(intent_name, "2")
@@ -106,8 +146,163 @@ def create_intent_index(request: Request):
         return jsonify({'error': str(e)}), 500
 
 
-def create_embeddings(chunk: str) -> List[float]:
-    return EMBEDDINGS_MODEL.embed_query(chunk)
+def chunk_id(intent_name: str, source: str, text: str) -> str:
+    # Content addressed, so an unchanged chunk keeps its id across builds.
+    digest = sha256(f"{source}\n{text}".encode()).hexdigest()[:32]
+    return f"{intent_name}-{digest}"
+
+def unique_records(intent_name: str, records: Iterable[Record]) -> Iterator[Tuple[str, str, str]]:
+    """Yields (source, chunk id, text), skipping repeated chunks of a source."""
+    current_source, seen = None, set()
+    for source, _, text in records:
+        if source != current_source:
+            current_source, seen = source, set()
+        doc_id = chunk_id(intent_name, source, text)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        yield source, doc_id, text
+
+def to_embedding(doc_id: str, text: str, index_name: str) -> Embedding:
+    return Embedding(
+        id=doc_id,
+        text=text,
+        index=index_name,
+        author="system",
+        timestamp=datetime.now().strftime(TIME_FORMAT),
+    )
+
+def store_embeddings(big_query_repository: BigQueryRepository, chunk_store: Optional[ChunkStore], embeddings: List[Embedding]):
+    if chunk_store:
+        chunk_store.add((embedding.id, embedding.text) for embedding in embeddings)
+    big_query_repository.insert_rows(EMBEDDINGS_TABLE, embeddings)
+
+def chunk_store_path(intent_name: str) -> str:
+    return f"{CHUNKS_FOLDER}/{intent_name}/{CHUNKS_FILE}"
+
+def download_chunk_store(gcs_repository: CloudStorageRepository, intent_name: str) -> Optional[ChunkStore]:
+    path = join(mkdtemp(), CHUNKS_FILE)
+    if not gcs_repository.download_file(chunk_store_path(intent_name), path):
+        return None
+    return ChunkStore(path)
+
+def upload_chunk_store(gcs_repository: CloudStorageRepository, intent_name: str, chunk_store: ChunkStore):
+    chunk_store.close()
+    gcs_repository.upload_file(chunk_store_path(intent_name), chunk_store.path, CHUNKS_CONTENT_TYPE)
+
+def manifest_path(intent_name: str) -> str:
+    return f"{MANIFESTS_FOLDER}/{intent_name}/{MANIFEST_FILE}"
+
+def load_manifest(gcs_repository: CloudStorageRepository, intent_name: str) -> Optional[IndexManifest]:
+    content = gcs_repository.read(manifest_path(intent_name))
+    if not content:
+        return None
+    return IndexManifest.model_validate_json(content)
+
+def save_manifest(gcs_repository: CloudStorageRepository, intent_name: str, manifest: IndexManifest):
+    gcs_repository.create(manifest_path(intent_name), manifest.model_dump_json())
+
+def update_index(
+    intent: Intent,
+    manifest: IndexManifest,
+    chunk_service: ChunkService,
+    embedding_service: EmbeddingService,
+    gcs_repository: CloudStorageRepository,
+    big_query_repository: BigQueryRepository,
+):
+    """Applies the changes of the intent bucket to its existing index.
+
+    Only sources whose MD5 hash changed are parsed, only chunks with a new
+    content id are embedded, and chunks that disappeared are removed from
+    the index, the embeddings file, the chunk store and BigQuery.
+    """
+    index = MatchingEngineIndex(manifest.index_resource) if manifest.index_resource else None
+    # Intents indexed before the chunk store existed keep the BigQuery fallback.
+    chunk_store = download_chunk_store(gcs_repository, intent.name)
+    blobs = {chunk_service.source_name(blob): blob for blob in chunk_service.list_blobs()}
+
+    removed_ids: Set[str] = set()
+    for source in [source for source in manifest.sources if source not in blobs]:
+        removed_ids.update(manifest.sources.pop(source).chunks)
+
+    changed = {
+        source: blob for source, blob in blobs.items()
+        if source not in manifest.sources or manifest.sources[source].hash != blob.md5_hash
+    }
+    print(f"{len(changed)} new or changed sources, {len(removed_ids)} chunks of deleted sources")
+
+    previous_ids = {
+        source: set(manifest.sources[source].chunks) if source in manifest.sources else set()
+        for source in changed
+    }
+    current_ids: Dict[str, List[str]] = {source: [] for source in changed}
+
+    def records_to_embed() -> Iterator[Tuple[str, str, str]]:
+        for source, doc_id, text in unique_records(intent.name, chunk_service.generate_records(changed.values())):
+            current_ids[source].append(doc_id)
+            if doc_id not in previous_ids[source]:
+                yield source, doc_id, text
+
+    new_datapoints: Dict[str, List[float]] = {}
+    datapoints: List[IndexDatapoint] = []
+    embeddings: List[Embedding] = []
+    for (_, doc_id, chunk), embedding in embedding_service.embed(records_to_embed(), itemgetter(2)):
+        new_datapoints[doc_id] = embedding
+        if index:
+            datapoints.append(IndexDatapoint(datapoint_id=doc_id, feature_vector=embedding))
+        embeddings.append(to_embedding(doc_id, chunk, manifest.index_name))
+        if len(datapoints) >= INDEX_UPSERT_BATCH_SIZE:
+            index.upsert_datapoints(datapoints=datapoints)
+            datapoints = []
+        if len(embeddings) >= EMBEDDINGS_INSERT_BATCH_SIZE:
+            store_embeddings(big_query_repository, chunk_store, embeddings)
+            embeddings = []
+    if datapoints:
+        index.upsert_datapoints(datapoints=datapoints)
+    if embeddings:
+        store_embeddings(big_query_repository, chunk_store, embeddings)
+
+    for source, blob in changed.items():
+        removed_ids.update(previous_ids[source].difference(current_ids[source]))
+        manifest.sources[source] = SourceManifest(hash=blob.md5_hash, chunks=current_ids[source])
+
+    if removed_ids:
+        if index:
+            index.remove_datapoints(datapoint_ids=list(removed_ids))
+        big_query_repository.delete_embeddings(manifest.index_name, list(removed_ids))
+
+    if new_datapoints or removed_ids:
+        rewrite_index_embeddings(gcs_repository, intent.name, new_datapoints, removed_ids)
+        if chunk_store:
+            chunk_store.remove(removed_ids)
+            upload_chunk_store(gcs_repository, intent.name, chunk_store)
+    save_manifest(gcs_repository, intent.name, manifest)
+    print(f"{len(new_datapoints)} embeddings upserted, {len(removed_ids)} removed")
+
+def rewrite_index_embeddings(
+    gcs_repository: CloudStorageRepository,
+    intent_name: str,
+    new_datapoints: Dict[str, List[float]],
+    removed_ids: Set[str],
+):
+    # The embeddings file stays the full contents of the index, so a later
+    # full rebuild from it matches what was streamed.
+    embeddings_path = f"{EMBEDDINGS_FOLDER}/{intent_name}/{EMBEDDINGS_FILE}"
+    staging_path = f"{MANIFESTS_FOLDER}/{intent_name}/{EMBEDDINGS_FILE}"
+    with gcs_repository.open_reader(embeddings_path) as current, gcs_repository.open_writer(staging_path) as updated:
+        for line in current:
+            if line.strip() and json.loads(line)["id"] not in removed_ids:
+                updated.write(line if line.endswith("\n") else f"{line}\n")
+        for doc_id, embedding in new_datapoints.items():
+            updated.write(to_index_datapoint(doc_id, embedding))
+    gcs_repository.move(staging_path, embeddings_path)
+
+
+def to_index_datapoint(doc_id: str, embedding: List[float]) -> str:
+    # Vector Search stores float32 values, which 9 significant digits always
+    # round-trip, so the file is smaller than with repr without changing them.
+    values = ",".join(f"{value:.9g}" for value in embedding)
+    return f'{{"id":{json.dumps(doc_id)},"embedding":[{values}]}}\n'
 
 def create_index(index_unique_name: str, intent_name: str, bucket_name: str):
     print(f"Creating index: {index_unique_name}")
@@ -117,11 +312,24 @@ def create_index(index_unique_name: str, intent_name: str, bucket_name: str):
         approximate_neighbors_count=INDEX_NEIGHBORS_COUNT,
         distance_measure_type=INDEX_DISTANCE_MEASURE,
         contents_delta_uri=f"gs://{bucket_name}/{EMBEDDINGS_FOLDER}/{intent_name}",
+        index_update_method=INDEX_UPDATE_METHOD,
     )
 
 def deploy_index_endpoint(index_endpoint: MatchingEngineIndexEndpoint, index: MatchingEngineIndex):
+    remove_previous_indexes(index_endpoint, index)
     print("Deploying index...")
     index_endpoint.deploy_index(
         index=index,
         deployed_index_id=index.display_name.replace('-','_'),
-    )
\ No newline at end of file
+    )
+
+def remove_previous_indexes(index_endpoint: MatchingEngineIndexEndpoint, index: MatchingEngineIndex):
+    # Each intent has its own endpoint and the backend queries its first
+    # deployed index, so a rebuilt index replaces the previous ones instead
+    # of being served, and billed, next to them.
+    for deployed_index in index_endpoint.deployed_indexes:
+        print(f"Undeploying previous index {deployed_index.id}")
+        index_endpoint.undeploy_index(deployed_index_id=deployed_index.id)
+        if deployed_index.index != index.resource_name:
+            print(f"Deleting previous index {deployed_index.index}")
+            MatchingEngineIndex(deployed_index.index).delete()
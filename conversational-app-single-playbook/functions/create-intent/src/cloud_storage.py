@@ -12,15 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
+from typing import List, Optional, TextIO
 from google.cloud.storage import Client, Blob
 
 BASE_BUCKET="quick-bot"
 EMBEDDINGS_FILE="embeddings.json"
 EMBEDDINGS_FOLDER="embeddings"
+# Kept out of EMBEDDINGS_FOLDER, which is the index contents_delta_uri.
+MANIFESTS_FOLDER="manifests"
+MANIFEST_FILE="manifest.json"
+CHUNKS_FOLDER="chunks"
+CHUNKS_FILE="chunks.db"
+CHUNKS_CONTENT_TYPE="application/vnd.sqlite3"
 
 CONTENT_TYPE="text/plain"
 
+# Resumable uploads are sent in parts of this size, which bounds the memory
+# used by a streaming upload. Must be a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
 class CloudStorageRepository:
 
     def __init__(self, project_id: str):
@@ -31,4 +41,33 @@ class CloudStorageRepository:
     def create(self, resource_name: str, content: str):
         new_blob = self.bucket.blob(resource_name)
         new_blob.content_type = CONTENT_TYPE
-        new_blob.upload_from_string(content)
\ No newline at end of file
+        new_blob.upload_from_string(content)
+
+    def open_writer(self, resource_name: str) -> TextIO:
+        """Opens a text stream that uploads to GCS with a resumable upload."""
+        new_blob = self.bucket.blob(resource_name)
+        return new_blob.open("w", chunk_size=UPLOAD_CHUNK_SIZE, content_type=CONTENT_TYPE)
+
+    def read(self, resource_name: str) -> Optional[str]:
+        blob = self.bucket.blob(resource_name)
+        if not blob.exists():
+            return None
+        return blob.download_as_text()
+
+    def open_reader(self, resource_name: str) -> TextIO:
+        return self.bucket.blob(resource_name).open("r")
+
+    def move(self, source_name: str, destination_name: str):
+        source_blob = self.bucket.blob(source_name)
+        self.bucket.copy_blob(source_blob, self.bucket, destination_name)
+        source_blob.delete()
+
+    def upload_file(self, resource_name: str, path: str, content_type: str = CONTENT_TYPE):
+        self.bucket.blob(resource_name).upload_from_filename(path, content_type=content_type)
+
+    def download_file(self, resource_name: str, path: str) -> bool:
+        blob = self.bucket.blob(resource_name)
+        if not blob.exists():
+            return False
+        blob.download_to_filename(path)
+        return True
@@ -14,13 +14,29 @@
 
 """API endpoints for managing and performing document searches."""
 
+import asyncio
+from json import dumps
+from typing import Mapping
 from fastapi import APIRouter, Request, HTTPException, Response
-from google.cloud import storage
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from google.api_core.exceptions import NotFound as GoogleNotFound
 from pydantic import BaseModel
-from src.model.http_status import BadRequest
+from src.model.http_status import BadRequest, NotFound
 from src.model.search import CreateSearchRequest, SearchApplication
+from src.service.document import (
+    DOCUMENT_CACHE,
+    DOCUMENT_CACHE_CONTROL,
+    DocumentService,
+    is_not_modified,
+    is_range_allowed,
+    parse_range,
+)
 from src.service.engine import EngineService
 from src.service.search import SearchService
+from src.service.search_cache import SEARCH_CACHE
+from src.service.search_registry import SEARCH_REGISTRY
+from src.service.search_summary import PENDING_SUMMARIES
 from src.service.search_application import SearchApplicationService
 
 
@@ -30,7 +46,9 @@ class SignedUrlRequest(BaseModel):
     gcs_url: str
 
 
-storage_client = storage.Client()
+# Comment lines sent while a summary is pending, so proxies keep the
+# connection open.
+SUMMARY_KEEP_ALIVE_SECONDS = 15
 
 router = APIRouter(
     prefix="/api/search",
@@ -40,12 +58,19 @@ router = APIRouter(
 
 
 @router.post("")
-async def search(item: CreateSearchRequest):
+def search(item: CreateSearchRequest):
     """
     Performs a search using the configured Search Application.
 
+    Runs in the threadpool, so identical concurrent searches wait on a
+    single Discovery Engine call instead of blocking the event loop.
+
     Args:
-        item: The search request containing the search term.
+        item: The search request containing the search term. If it sets
+              defer_summary, the results are returned without the summary,
+              along with a token for GET /api/search/summary/{token}.
+              Its page_token selects a page after the first, the next
+              page being prefetched in the background.
 
     Raises:
         BadRequest: If no Search Application is configured for the project.
@@ -53,15 +78,65 @@ async def search(item: CreateSearchRequest):
     Returns:
         The search results from the SearchService.
     """
-    service = SearchApplicationService()
-    search_application = service.get()
+    search_application = SEARCH_REGISTRY.get_application()
     if not search_application:
         raise BadRequest(detail="No Search Application found on project")
 
     service = SearchService(
         search_application,
     )
-    return service.search(item.term)
+    if item.defer_summary:
+        return service.search_deferred(
+            item.term, item.page_size, item.page_token
+        )
+    return service.search(item.term, item.page_size, item.page_token)
+
+
+@router.get("/summary/{summary_token}")
+async def stream_summary(summary_token: str):
+    """
+    Streams the summary of a deferred search as Server-Sent Events.
+
+    Sends a single "summary" event, with a JSON object holding the
+    summary, once it's generated, or an "error" event if it failed.
+
+    Args:
+        summary_token: The token returned by the deferred search.
+
+    Raises:
+        NotFound: If the token is unknown or expired.
+    """
+    future = PENDING_SUMMARIES.get(summary_token)
+    if future is None:
+        raise NotFound(detail="Summary not found or expired")
+
+    async def event_stream():
+        pending = asyncio.wrap_future(future)
+        while not pending.done():
+            await asyncio.wait({pending}, timeout=SUMMARY_KEEP_ALIVE_SECONDS)
+            if not pending.done():
+                yield ": keep-alive\n\n"
+        try:
+            summary = pending.result().summary
+        except Exception as e:
+            yield f"event: error\ndata: {dumps({'detail': str(e)})}\n\n"
+            return
+        yield f"event: summary\ndata: {dumps({'summary': summary})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Returns the counters of the search and document caches."""
+    return {
+        "search_cache": SEARCH_CACHE.stats(),
+        "document_cache": DOCUMENT_CACHE.stats(),
+    }
 
 
 @router.get("/engines")
@@ -90,7 +165,9 @@ async def create_search_application(search_application: SearchApplication):
         The created Search Application configuration.
     """
     service = SearchApplicationService()
-    return service.create(search_application)
+    created = service.create(search_application)
+    SEARCH_REGISTRY.invalidate()
+    return created
 
 
 @router.put("/application/{engine_id}")
@@ -109,16 +186,94 @@ async def update_search_application(
         The updated Search Application configuration.
     """
     service = SearchApplicationService()
-    return service.update(engine_id, search_application)
+    updated = service.update(engine_id, search_application)
+    SEARCH_REGISTRY.invalidate()
+    return updated
+
+
+def document_response(gcs_url: str, headers: Mapping[str, str]) -> Response:
+    """
+    Builds the streamed response of a GCS document for the request headers.
+
+    Honours a single byte Range, If-Range, If-None-Match and
+    If-Modified-Since, and sends the ETag and Last-Modified of the object.
+
+    Raises:
+        BadRequest: If the GCS URL is invalid.
+        NotFound: If the document doesn't exist.
+        HTTPException: If the document metadata cannot be fetched.
+    """
+    service = DocumentService()
+    try:
+        document = service.get(gcs_url)
+    except ValueError as e:
+        raise BadRequest(detail=str(e))
+    except GoogleNotFound:
+        raise NotFound(detail=f"Document not found: {gcs_url}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching document: {str(e)}"
+        )
+
+    response_headers = {
+        **document.validators(),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": DOCUMENT_CACHE_CONTROL,
+    }
+    if is_not_modified(document, headers):
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = None
+    if headers.get("range") and is_range_allowed(document, headers):
+        try:
+            byte_range = parse_range(headers["range"], document.size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{document.size}"},
+            )
+
+    start, end = byte_range or (0, document.size - 1)
+    response_headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        response_headers["Content-Range"] = (
+            f"bytes {start}-{end}/{document.size}"
+        )
+    return StreamingResponse(
+        service.read(document, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=document.content_type,
+        headers=response_headers,
+    )
+
+
+@router.get("/doc")
+def stream_document(gcs_url: str, request: Request):
+    """
+    Streams a document from GCS, e.g. to a PDF viewer.
+
+    Supports Range requests, so viewers can fetch the pages they show,
+    and conditional requests using the ETag or Last-Modified sent.
+
+    Args:
+        gcs_url: The full GCS path of the document
+                 (e.g., "gs://your-bucket-name/your-file.pdf").
+        request: The incoming FastAPI request object.
+
+    Returns:
+        A StreamingResponse with the document, or the requested range.
+    """
+    return document_response(gcs_url, request.headers)
 
 
 @router.post("/doc")
 async def get_document(request: Request, response_model=None):
     """
-    Fetches a document directly from GCS and returns its content.
+    Fetches a document directly from GCS and streams its content.
 
     Expects a JSON body with a 'gcs_url' field specifying the full GCS path
-    (e.g., "gs://your-bucket-name/your-file.pdf").
+    (e.g., "gs://your-bucket-name/your-file.pdf"). Headers are handled as
+    in GET /doc.
 
     Args:
         request: The incoming FastAPI request object.
@@ -127,27 +282,13 @@ async def get_document(request: Request, response_model=None):
         HTTPException: If the GCS URL is invalid or the file cannot be fetched.
 
     Returns:
-        A FastAPI Response object containing the raw PDF content.
+        A StreamingResponse with the document content.
     """
     try:
         req_body = await request.json()
         signed_url_request = SignedUrlRequest(**req_body)
-        gcs_url = signed_url_request.gcs_url
-
-        bucket_name = gcs_url.split("/")[2]
-        object_name = "/".join(gcs_url.split("/")[3:])
-
-        # Get a reference to the blob (PDF file)
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(object_name)
-
-        # Download the blob content as bytes
-        pdf_content = blob.download_as_bytes()
-
-        # Return the PDF content with appropriate headers
-        return Response(content=pdf_content, media_type="application/pdf")
-
     except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error fetching PDF: {str(e)}"
-        )
+        raise BadRequest(detail=f"Invalid document request: {str(e)}")
+    return await run_in_threadpool(
+        document_response, signed_url_request.gcs_url, request.headers
+    )
@@ -51,3 +51,16 @@ class BadRequest(HTTPException):
     """
     def __init__(self, detail="Resource already exists"):
         super().__init__(status_code=400, detail=detail)
+
+
+class NotFound(HTTPException):
+    """
+    Custom exception for HTTP 404 Not Found errors.
+
+    Used when a requested resource doesn't exist or has expired.
+    Defaults to status code 404.
+    """
+
+    def __init__(self, detail="Resource not found"):
+        """Initializes the exception with a default detail message."""
+        super().__init__(status_code=404, detail=detail)
@@ -22,7 +22,7 @@ Project ID.
 
 from dataclasses import dataclass
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from google.cloud.bigquery import SchemaField
 from google.api_core.client_options import ClientOptions
 import google.auth
@@ -31,8 +31,17 @@ _, PROJECT_ID = google.auth.default()
 
 
 class CreateSearchRequest(BaseModel):
-    """Request model for initiating a search."""
+    """Request model for initiating a search.
+
+    When defer_summary is set, the results are returned without waiting
+    for the summary, along with a token to stream it afterwards. Pages
+    after the first are requested with the next_page_token of the previous
+    one, and the same term, page_size and defer_summary.
+    """
     term: str
+    defer_summary: bool = False
+    page_size: int = Field(default=10, ge=1, le=100)
+    page_token: Optional[str] = None
 
 
 class SearchApplication(BaseModel):
@@ -120,3 +129,13 @@ class SearchResultsWithSummary:
     """Represents the complete results of a search, including a summary."""
     results: List[SearchResult]
     summary: Optional[str] = None
+    next_page_token: Optional[str] = None
+
+
+@dataclass
+class DeferredSearchResults:
+    """Represents the results of a search whose summary is still being
+    generated, and the token to fetch it with."""
+    results: List[SearchResult]
+    summary_token: Optional[str] = None
+    next_page_token: Optional[str] = None
@@ -0,0 +1,435 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Service streaming documents from Google Cloud Storage.
+
+Documents are sent in chunks of DOCUMENT_CHUNK_BYTES instead of being
+buffered whole, and byte ranges are read from GCS directly, so viewers
+like PDF.js can fetch the pages they display. Every object generation has
+a stable ETag and Last-Modified, which lets browsers and CDNs revalidate.
+
+Documents up to DOCUMENT_CACHE_MAX_FILE_BYTES are also downloaded in the
+background to a disk cache under DOCUMENT_CACHE_DIR, which serves the
+following requests for that generation. Each worker process caches in
+its own subdirectory and evicts its least recently used files beyond
+DOCUMENT_CACHE_MAX_BYTES. The directories of workers that exited are
+deleted when a new worker starts caching. On Cloud Run the disk is in
+memory, so keep DOCUMENT_CACHE_MAX_BYTES times the number of workers
+within the instance memory.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import sha256
+from mimetypes import guess_type
+from os import getenv, getpid, kill, listdir, makedirs, path, remove, replace
+from shutil import rmtree
+from tempfile import NamedTemporaryFile, gettempdir
+from threading import Lock
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+)
+from google.cloud import storage
+
+DOCUMENT_CHUNK_BYTES = int(getenv("DOCUMENT_CHUNK_BYTES", str(1024 * 1024)))
+DOCUMENT_CACHE_DIR = getenv(
+    "DOCUMENT_CACHE_DIR", path.join(gettempdir(), "document-cache")
+)
+# Per worker process, the Dockerfile runs four.
+DOCUMENT_CACHE_MAX_BYTES = int(
+    getenv("DOCUMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+DOCUMENT_CACHE_MAX_FILE_BYTES = int(
+    getenv("DOCUMENT_CACHE_MAX_FILE_BYTES", str(256 * 1024 * 1024))
+)
+# Browsers and CDNs may store documents but must revalidate them.
+DOCUMENT_CACHE_CONTROL = getenv("DOCUMENT_CACHE_CONTROL", "no-cache")
+
+# The search results link to documents with the second form.
+GCS_URL_PREFIXES = ("gs://", "https://storage.cloud.google.com/")
+
+storage_client = storage.Client()
+
+
+@dataclass(frozen=True)
+class Document:
+    """Metadata of one generation of a GCS object."""
+
+    bucket: str
+    name: str
+    generation: int
+    size: int
+    etag: str
+    updated: Optional[datetime]
+    content_type: str
+
+    @property
+    def cache_key(self) -> str:
+        """Name of the document in the disk cache."""
+        return sha256(
+            f"{self.bucket}/{self.name}#{self.generation}".encode()
+        ).hexdigest()
+
+    def validators(self) -> Dict[str, str]:
+        """Returns the ETag and Last-Modified headers of the document."""
+        headers = {"ETag": f'"{self.etag}"'}
+        if self.updated:
+            headers["Last-Modified"] = format_datetime(
+                self.updated, usegmt=True
+            )
+        return headers
+
+
+def parse_gcs_url(gcs_url: str) -> Tuple[str, str]:
+    """Splits a gs:// or https://storage.cloud.google.com/ URL into its
+    bucket and object names.
+
+    Raises:
+        ValueError: If the URL has no bucket or object name.
+    """
+    for prefix in GCS_URL_PREFIXES:
+        if gcs_url.startswith(prefix):
+            bucket_name, _, object_name = gcs_url[len(prefix) :].partition("/")
+            if bucket_name and object_name:
+                return bucket_name, object_name
+    raise ValueError(f"Invalid GCS URL: {gcs_url}")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses a Range header into the first and last byte to send.
+
+    Only single byte ranges are supported. Returns None for anything
+    else, including malformed headers, in which case the whole document
+    is sent.
+
+    Raises:
+        ValueError: If the range can't be satisfied.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    if not (first or last).isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # A suffix range: the last `last` bytes.
+        if int(last) == 0 or size == 0:
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def is_not_modified(document: Document, headers: Mapping[str, str]) -> bool:
+    """Evaluates If-None-Match, or If-Modified-Since in its absence."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        return "*" in tags or f'"{document.etag}"' in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and document.updated:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # A -0000 zone parses to a naive datetime, which is UTC.
+            since = since.replace(tzinfo=timezone.utc)
+        return document.updated.replace(microsecond=0) <= since
+    return False
+
+
+def is_range_allowed(document: Document, headers: Mapping[str, str]) -> bool:
+    """Evaluates If-Range: a range is only sent for the expected
+    version of the document."""
+    if_range = headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == f'"{document.etag}"'
+    return document.validators().get("Last-Modified") == if_range
+
+
+class DocumentDiskCache:
+    """Bounded LRU of whole documents on the local disk.
+
+    Attributes:
+        directory: Where the documents are stored, a subdirectory per
+                   process so workers never evict or delete each other's
+                   files.
+        max_bytes: Maximum total size of the stored documents.
+        max_file_bytes: Larger documents are never cached.
+    """
+
+    def __init__(
+        self,
+        directory: str = DOCUMENT_CACHE_DIR,
+        max_bytes: int = DOCUMENT_CACHE_MAX_BYTES,
+        max_file_bytes: int = DOCUMENT_CACHE_MAX_FILE_BYTES,
+    ):
+        """Initializes the cache. Files left by a previous process with the
+        same pid are indexed on first use."""
+        self.directory = path.join(directory, str(getpid()))
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self._lock = Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._bytes = 0
+        self._filling = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="document-cache"
+        )
+        self._hits = 0
+        self._misses = 0
+        self._fills = 0
+        self._evictions = 0
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Returns the cached document opened for reading, or None."""
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self._misses += 1
+                return None
+            index.move_to_end(key)
+            self._hits += 1
+        try:
+            # Evicting a file after it's opened doesn't affect the reader.
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+
+    def fill(self, key: str, size: int, download: Callable[[BinaryIO], Any]):
+        """Downloads a document into the cache in the background, unless
+        it's too large or already being downloaded.
+
+        Args:
+            key: The name of the document in the cache.
+            size: The size of the document.
+            download: Writes the document to the given file.
+        """
+        if size > self.max_file_bytes:
+            return
+        with self._lock:
+            if key in self._filling or key in self._load_index():
+                return
+            self._filling.add(key)
+        self._executor.submit(self._fill, key, download)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            index = self._load_index()
+            return {
+                "documents": len(index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "fills": self._fills,
+                "evictions": self._evictions,
+            }
+
+    def _fill(self, key: str, download: Callable[[BinaryIO], Any]):
+        temporary = None
+        try:
+            with NamedTemporaryFile(
+                dir=self.directory, suffix=".part", delete=False
+            ) as file:
+                temporary = file.name
+                download(file)
+                size = file.tell()
+            replace(temporary, self._path(key))
+            temporary = None
+            with self._lock:
+                self._index[key] = size
+                self._bytes += size
+                self._fills += 1
+                self._evict()
+        except Exception as e:
+            print(f"Error caching document {key}: {e}")
+        finally:
+            if temporary:
+                try:
+                    remove(temporary)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._filling.discard(key)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            self._remove_orphans()
+            makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in listdir(self.directory):
+                file_path = path.join(self.directory, name)
+                if name.endswith(".part"):
+                    remove(file_path)
+                    continue
+                entries.append((path.getatime(file_path), name))
+            self._index = OrderedDict()
+            for _, name in sorted(entries):
+                size = path.getsize(path.join(self.directory, name))
+                self._index[name] = size
+                self._bytes += size
+            self._evict()
+        return self._index
+
+    def _remove_orphans(self):
+        """Deletes the directories of worker processes that exited."""
+        parent = path.dirname(self.directory)
+        if not path.isdir(parent):
+            return
+        for name in listdir(parent):
+            if name.isdigit() and not _is_alive(int(name)):
+                rmtree(path.join(parent, name), ignore_errors=True)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._forget(key)
+            self._evictions += 1
+            try:
+                remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, key: str):
+        self._bytes -= self._index.pop(key, 0)
+
+    def _path(self, key: str) -> str:
+        return path.join(self.directory, key)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Owned by another user, but running.
+    return True
+
+
+DOCUMENT_CACHE = DocumentDiskCache()
+
+
+class DocumentService:
+    """Reads documents from GCS, or from the disk cache when possible."""
+
+    def __init__(
+        self,
+        client: storage.Client = storage_client,
+        cache: DocumentDiskCache = DOCUMENT_CACHE,
+    ):
+        """Initializes the service with a storage client and a cache."""
+        self.client = client
+        self.cache = cache
+
+    def get(self, gcs_url: str) -> Document:
+        """
+        Fetches the metadata of the current generation of a document.
+
+        Args:
+            gcs_url: The gs:// or https://storage.cloud.google.com/ URL
+                     of the document.
+
+        Returns:
+            The Document metadata.
+
+        Raises:
+            ValueError: If the URL is invalid.
+            google.api_core.exceptions.NotFound: If the document doesn't
+                                                 exist.
+        """
+        bucket_name, object_name = parse_gcs_url(gcs_url)
+        blob = self.client.bucket(bucket_name).blob(object_name)
+        blob.reload()
+        return Document(
+            bucket=bucket_name,
+            name=object_name,
+            generation=blob.generation,
+            size=blob.size or 0,
+            etag=blob.etag,
+            updated=blob.updated,
+            content_type=blob.content_type
+            or guess_type(object_name)[0]
+            or "application/octet-stream",
+        )
+
+    def read(self, document: Document, start: int, end: int) -> Iterator[bytes]:
+        """
+        Returns an iterator over the bytes `start` to `end` (inclusive)
+        of a document, in chunks of at most DOCUMENT_CHUNK_BYTES.
+
+        Reads from the disk cache if the document is there, otherwise from
+        GCS, while caching it in the background for the next requests.
+        """
+        file = self.cache.open(document.cache_key)
+        if file is not None:
+            return self._read_file(file, start, end)
+        self.cache.fill(
+            document.cache_key,
+            document.size,
+            lambda file: self._blob(document).download_to_file(file),
+        )
+        return self._read_gcs(document, start, end)
+
+    def _blob(self, document: Document) -> storage.Blob:
+        # Pinned to the generation, so the bytes always match the ETag.
+        return self.client.bucket(document.bucket).blob(
+            document.name, generation=document.generation
+        )
+
+    def _read_gcs(
+        self, document: Document, start: int, end: int
+    ) -> Iterator[bytes]:
+        blob = self._blob(document)
+        position = start
+        while position <= end:
+            last = min(position + DOCUMENT_CHUNK_BYTES - 1, end)
+            yield blob.download_as_bytes(start=position, end=last)
+            position = last + 1
+
+    @staticmethod
+    def _read_file(file: BinaryIO, start: int, end: int) -> Iterator[bytes]:
+        with file:
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = file.read(min(DOCUMENT_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
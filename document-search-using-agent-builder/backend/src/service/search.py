@@ -14,12 +14,17 @@
 
 """Service for performing searches using Google Cloud Discovery Engine."""
 
+from typing import Optional
 from google.cloud.discoveryengine_v1 import SearchRequest, SearchServiceClient
 from src.model.search import (
+    DeferredSearchResults,
     SearchApplication,
     SearchResult,
     SearchResultsWithSummary,
 )
+from src.service.search_cache import SEARCH_CACHE, SearchCache
+from src.service.search_registry import SEARCH_REGISTRY
+from src.service.search_summary import PENDING_SUMMARIES, PendingSummaries
 
 CONTENT_SEARCH_SPEC = SearchRequest.ContentSearchSpec(
     snippet_spec=SearchRequest.ContentSearchSpec.SnippetSpec(
@@ -38,6 +43,11 @@ CONTENT_SEARCH_SPEC = SearchRequest.ContentSearchSpec(
         ),
     ),
 )
+# Same as CONTENT_SEARCH_SPEC without the summary, which is the slow part.
+RESULTS_CONTENT_SEARCH_SPEC = SearchRequest.ContentSearchSpec(
+    snippet_spec=CONTENT_SEARCH_SPEC.snippet_spec,
+    extractive_content_spec=CONTENT_SEARCH_SPEC.extractive_content_spec,
+)
 QUERY_EXPANSION_SPEC = SearchRequest.QueryExpansionSpec(
     condition=SearchRequest.QueryExpansionSpec.Condition.AUTO,
 )
@@ -45,6 +55,8 @@ SPELL_CORRECTION_SPEC = SearchRequest.SpellCorrectionSpec(
     mode=SearchRequest.SpellCorrectionSpec.Mode.AUTO
 )
 
+DEFAULT_PAGE_SIZE = 10
+
 
 class SearchService:
     """
@@ -55,20 +67,151 @@ class SearchService:
     methods to perform searches against the corresponding engine.
     """
 
-    def __init__(self, search_application: SearchApplication):
+    def __init__(
+        self,
+        search_application: SearchApplication,
+        cache: SearchCache = SEARCH_CACHE,
+        summaries: PendingSummaries = PENDING_SUMMARIES,
+    ):
         """
         Initializes the SearchService.
 
         Args:
             search_application: The configuration object defining the target
                                 search engine, location, and serving config.
+            cache: Where search responses are cached and concurrent
+                   identical searches coalesced.
+            summaries: Runs the summaries of deferred searches.
         """
-        self.search_client = SearchServiceClient(
-            client_options=search_application.get_client_options()
+        self.search_client: SearchServiceClient = SEARCH_REGISTRY.get_client(
+            search_application
         )
         self.serving_config = search_application.get_serving_config()
+        self.cache = cache
+        self.summaries = summaries
+
+    def search(
+        self,
+        term: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        prefetch: bool = True,
+    ) -> SearchResultsWithSummary:
+        """
+        Performs a search, reusing the cached response of the same
+        normalized term and page when there is one.
+
+        Args:
+            term: The search query string.
+            page_size: The number of results per page.
+            page_token: The next_page_token of the previous page, or None
+                        for the first page.
+            prefetch: Whether to load the next page in the background.
+
+        Returns:
+            A SearchResultsWithSummary object, see `search_uncached`.
+        """
+        return self._search_page(term, True, page_size, page_token, prefetch)
 
-    def search(self, term: str) -> SearchResultsWithSummary:
+    def search_results(
+        self,
+        term: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        prefetch: bool = True,
+    ) -> SearchResultsWithSummary:
+        """
+        Performs a search without a summary, reusing the cached response
+        of the same normalized term and page when there is one.
+
+        Args:
+            term: The search query string.
+            page_size: The number of results per page.
+            page_token: The next_page_token of the previous page, or None
+                        for the first page.
+            prefetch: Whether to load the next page in the background.
+
+        Returns:
+            A SearchResultsWithSummary object without summary.
+        """
+        return self._search_page(term, False, page_size, page_token, prefetch)
+
+    def search_deferred(
+        self,
+        term: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+    ) -> DeferredSearchResults:
+        """
+        Returns the results of a search as soon as they are retrieved and
+        generates its summary in the background.
+
+        Args:
+            term: The search query string.
+            page_size: The number of results per page.
+            page_token: The next_page_token of the previous page, or None
+                        for the first page. Only the first page has a
+                        summary.
+
+        Returns:
+            A DeferredSearchResults object with the results, the token
+            to fetch the summary with and the token of the next page.
+        """
+        summary_token = None
+        if not page_token:
+            summary_token = self.summaries.start(
+                lambda: self.search(term, page_size, prefetch=False)
+            )
+        page = self.search_results(term, page_size, page_token)
+        return DeferredSearchResults(
+            results=page.results,
+            summary_token=summary_token,
+            next_page_token=page.next_page_token,
+        )
+
+    def _search_page(
+        self,
+        term: str,
+        with_summary: bool,
+        page_size: int,
+        page_token: Optional[str],
+        prefetch: bool,
+    ) -> SearchResultsWithSummary:
+        """Returns a cached page and prefetches the one after it.
+
+        Discovery Engine only accepts a page token along with the same
+        parameters as the request that returned it, so the summary and
+        page size are part of the cache key.
+        """
+
+        def load(token: Optional[str]):
+            return lambda: self.search_uncached(
+                term, with_summary, page_size, token
+            )
+
+        def variant(token: Optional[str]) -> str:
+            kind = "summary" if with_summary else "results"
+            return f"{kind}:{page_size}:{token or ''}"
+
+        page = self.cache.get_or_load(
+            self.serving_config, term, load(page_token), variant(page_token)
+        )
+        if prefetch and page.next_page_token:
+            self.cache.prefetch(
+                self.serving_config,
+                term,
+                load(page.next_page_token),
+                variant(page.next_page_token),
+            )
+        return page
+
+    def search_uncached(
+        self,
+        term: str,
+        with_summary: bool = True,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+    ) -> SearchResultsWithSummary:
         """
         Performs a search against the configured Discovery Engine.
 
@@ -78,12 +221,18 @@ class SearchService:
 
         Args:
             term: The search query string.
+            with_summary: Whether to generate a summary, which makes the
+                          request several times slower.
+            page_size: The number of results per page.
+            page_token: The next_page_token of the previous page, or None
+                        for the first page.
 
         Returns:
             A SearchResultsWithSummary object containing the search summary
             and a list of SearchResult objects. Returns an empty list of
             results and a default summary message if the search fails or
-            yields no results.
+            yields no results. The summary is None if `with_summary` is
+            False, and next_page_token is None on the last page.
 
         Raises:
             Logs errors if the API call fails.
@@ -91,8 +240,13 @@ class SearchService:
         request = SearchRequest(
             serving_config=self.serving_config,
             query=term,
-            page_size=10,
-            content_search_spec=CONTENT_SEARCH_SPEC,
+            page_size=page_size,
+            page_token=page_token or "",
+            content_search_spec=(
+                CONTENT_SEARCH_SPEC
+                if with_summary
+                else RESULTS_CONTENT_SEARCH_SPEC
+            ),
             query_expansion_spec=QUERY_EXPANSION_SPEC,
             spell_correction_spec=SPELL_CORRECTION_SPEC,
         )
@@ -100,11 +254,13 @@ class SearchService:
         data = self.search_client.search(request)
         results = []
 
-        summary_text = (
-            data.summary.summary_text
-            if data.summary and data.summary.summary_text
-            else "No summary available"
-        )
+        summary_text = None
+        if with_summary:
+            summary_text = (
+                data.summary.summary_text
+                if data.summary and data.summary.summary_text
+                else "No summary available"
+            )
 
         # Process results
         for r in data.results:
@@ -138,7 +294,9 @@ class SearchService:
             results.append(mapped_result)
 
         response_result = SearchResultsWithSummary(
-            summary=summary_text, results=results
+            summary=summary_text,
+            results=results,
+            next_page_token=data.next_page_token or None,
         )
 
         return response_result
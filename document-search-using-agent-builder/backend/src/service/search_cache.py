@@ -0,0 +1,260 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory cache of Discovery Engine search responses.
+
+Searches generate a summary with an LLM, so every upstream call takes
+seconds. SearchCache keeps the parsed responses keyed by serving config,
+variant of the request (e.g. with or without a summary) and normalized
+term, expires them after SEARCH_CACHE_TTL_SECONDS and evicts the least
+recently used ones beyond SEARCH_CACHE_MAX_ENTRIES.
+
+Concurrent misses on the same key are coalesced: the first request calls
+Discovery Engine and the others wait for its response, so a burst of
+identical queries makes a single upstream call. Responses can also be
+prefetched in the background, e.g. the next page of results while the
+user reads the current one.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from os import getenv
+from threading import Event, Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SEARCH_CACHE_TTL_SECONDS = float(getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_MAX_ENTRIES = int(getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_PREFETCH_WORKERS = int(getenv("SEARCH_PREFETCH_WORKERS", "4"))
+
+CacheKey = Tuple[str, str, str]
+
+
+def normalize_term(term: str) -> str:
+    """Lowercases a search term and collapses its whitespace."""
+    return " ".join(term.lower().split())
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    load_seconds: float
+    prefetched: bool = False
+
+
+@dataclass
+class _Flight:
+    """An upstream call in progress, shared by concurrent misses."""
+
+    done: Event = field(default_factory=Event)
+    started_at: float = field(default_factory=monotonic)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class SearchCache:
+    """Thread-safe TTL and LRU cache with single-flight loading.
+
+    Attributes:
+        max_entries: Maximum number of cached responses.
+        ttl_seconds: Lifetime of a cached response.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        prefetch_workers: int = SEARCH_PREFETCH_WORKERS,
+    ):
+        """Initializes an empty cache and a pool of `prefetch_workers`
+        threads for the prefetches."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._flights: Dict[CacheKey, _Flight] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._errors = 0
+        self._evictions = 0
+        self._saved_seconds = 0.0
+        self._upstream_seconds = 0.0
+        self._prefetches = 0
+        self._prefetch_hits = 0
+        self._prefetcher = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="search-prefetch"
+        )
+
+    def get_or_load(
+        self,
+        serving_config: str,
+        term: str,
+        load: Callable[[], Any],
+        variant: str = "",
+    ) -> Any:
+        """Returns the cached response of a search, loading it on a miss.
+
+        Args:
+            serving_config: The serving config the search runs against.
+            term: The search term, normalized before the lookup.
+            load: Calls Discovery Engine and returns the response. Only one
+                  call runs at a time per key.
+            variant: Distinguishes the requests made for the same term,
+                     e.g. with and without a summary, or another page.
+
+        Returns:
+            The cached or freshly loaded response.
+
+        Raises:
+            Whatever `load` raised. Failures are not cached.
+        """
+        key = (serving_config, variant, normalize_term(term))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                self._saved_seconds += entry.load_seconds
+                if entry.prefetched:
+                    entry.prefetched = False
+                    self._prefetch_hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return self._wait(flight)
+        return self._load(key, flight, load)
+
+    def prefetch(
+        self,
+        serving_config: str,
+        term: str,
+        load: Callable[[], Any],
+        variant: str = "",
+    ):
+        """Loads a response in the background unless it's already cached
+        or being loaded. Arguments are the same as for `get_or_load`.
+
+        Lookups arriving while the prefetch runs wait for it. Failures are
+        only counted, the next lookup retries.
+        """
+        key = (serving_config, variant, normalize_term(term))
+        with self._lock:
+            entry = self._entries.get(key)
+            if key in self._flights or (
+                entry is not None and entry.expires_at > monotonic()
+            ):
+                return
+            flight = _Flight()
+            self._flights[key] = flight
+            self._prefetches += 1
+        self._prefetcher.submit(self._prefetch, key, flight, load)
+
+    def _prefetch(self, key: CacheKey, flight: _Flight, load: Callable):
+        try:
+            self._load(key, flight, load, prefetched=True)
+        except Exception as e:
+            print(f"Error prefetching search {key}: {e}")
+
+    def _load(
+        self,
+        key: CacheKey,
+        flight: _Flight,
+        load: Callable[[], Any],
+        prefetched: bool = False,
+    ) -> Any:
+        try:
+            flight.value = load()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            load_seconds = monotonic() - flight.started_at
+            with self._lock:
+                self._flights.pop(key, None)
+                self._upstream_seconds += load_seconds
+                if flight.error is None:
+                    self._store(key, flight.value, load_seconds, prefetched)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self):
+        """Drops every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self._hits + self._coalesced + self._misses
+            served = self._hits + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "coalesced": self._coalesced,
+                "misses": self._misses,
+                "errors": self._errors,
+                "evictions": self._evictions,
+                "prefetches": self._prefetches,
+                "prefetch_hits": self._prefetch_hits,
+                "hit_ratio": served / lookups if lookups else 0.0,
+                "saved_seconds": round(self._saved_seconds, 3),
+                "upstream_seconds": round(self._upstream_seconds, 3),
+            }
+
+    def _wait(self, flight: _Flight) -> Any:
+        waited_from = monotonic()
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        # The follower only waited for the remainder of the leader's call.
+        saved = waited_from - flight.started_at
+        with self._lock:
+            self._saved_seconds += max(saved, 0.0)
+        return flight.value
+
+    def _store(
+        self,
+        key: CacheKey,
+        value: Any,
+        load_seconds: float,
+        prefetched: bool,
+    ):
+        self._entries[key] = _Entry(
+            value, monotonic() + self.ttl_seconds, load_seconds, prefetched
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+SEARCH_CACHE = SearchCache()
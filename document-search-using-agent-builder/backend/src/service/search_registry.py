@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process wide registry of the Search Application and its clients.
+
+Reading the Search Application runs a BigQuery job and creating a
+SearchServiceClient opens a new gRPC channel. SearchRegistry does both
+once: the application is kept until the POST/PUT /application handlers
+invalidate it, or for SEARCH_APPLICATION_TTL_SECONDS so changes made
+through another instance are eventually picked up. One client is kept
+per regional endpoint and reused by every search.
+"""
+
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Dict, Optional
+from google.cloud.discoveryengine_v1 import SearchServiceClient
+from src.model.search import SearchApplication
+from src.service.search_application import SearchApplicationService
+
+SEARCH_APPLICATION_TTL_SECONDS = float(
+    getenv("SEARCH_APPLICATION_TTL_SECONDS", "300")
+)
+GLOBAL_ENDPOINT = "global"
+
+
+class SearchRegistry:
+    """Caches the Search Application and one client per endpoint.
+
+    Attributes:
+        ttl_seconds: How long the Search Application is trusted before it
+                     is read again from BigQuery.
+    """
+
+    def __init__(self, ttl_seconds: float = SEARCH_APPLICATION_TTL_SECONDS):
+        """Initializes an empty registry."""
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._application: Optional[SearchApplication] = None
+        self._expires_at = 0.0
+        self._clients: Dict[str, SearchServiceClient] = {}
+
+    def get_application(self) -> Optional[SearchApplication]:
+        """Returns the configured Search Application, or None if there
+        is none, reading it from BigQuery only when it isn't cached."""
+        if monotonic() < self._expires_at:
+            return self._application
+        with self._lock:
+            if monotonic() >= self._expires_at:
+                self._application = SearchApplicationService().get()
+                self._expires_at = monotonic() + self.ttl_seconds
+            return self._application
+
+    def get_client(
+        self, search_application: SearchApplication
+    ) -> SearchServiceClient:
+        """Returns the shared client of the application's endpoint."""
+        client_options = search_application.get_client_options()
+        endpoint = (
+            client_options.api_endpoint if client_options else GLOBAL_ENDPOINT
+        )
+        client = self._clients.get(endpoint)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(endpoint)
+                if client is None:
+                    client = SearchServiceClient(client_options=client_options)
+                    self._clients[endpoint] = client
+        return client
+
+    def invalidate(self):
+        """Forgets the Search Application, e.g. after it was changed."""
+        with self._lock:
+            self._application = None
+            self._expires_at = 0.0
+
+
+SEARCH_REGISTRY = SearchRegistry()
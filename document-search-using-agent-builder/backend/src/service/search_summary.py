@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Summaries generated in the background of a deferred search.
+
+A deferred search returns its results from a request without a summary
+spec, which only pays for retrieval, and starts the search with the
+summary in the background. The client receives a token and streams the
+summary from GET /api/search/summary/{token} once it's ready.
+
+Tokens expire after SEARCH_SUMMARY_TTL_SECONDS, and at most
+SEARCH_SUMMARY_MAX_PENDING are kept, the oldest being dropped first.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Callable, Optional, Tuple
+from uuid import uuid4
+from src.model.search import SearchResultsWithSummary
+
+SEARCH_SUMMARY_WORKERS = int(getenv("SEARCH_SUMMARY_WORKERS", "8"))
+SEARCH_SUMMARY_TTL_SECONDS = float(getenv("SEARCH_SUMMARY_TTL_SECONDS", "300"))
+SEARCH_SUMMARY_MAX_PENDING = int(getenv("SEARCH_SUMMARY_MAX_PENDING", "1000"))
+
+
+class PendingSummaries:
+    """Runs summary searches in the background and tracks them by token.
+
+    Attributes:
+        ttl_seconds: How long a token can be redeemed.
+        max_pending: Maximum number of tokens kept.
+    """
+
+    def __init__(
+        self,
+        workers: int = SEARCH_SUMMARY_WORKERS,
+        ttl_seconds: float = SEARCH_SUMMARY_TTL_SECONDS,
+        max_pending: int = SEARCH_SUMMARY_MAX_PENDING,
+    ):
+        """Initializes the tracker and its pool of `workers` threads."""
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="search-summary"
+        )
+        self._lock = Lock()
+        self._pending: "OrderedDict[str, Tuple[Future, float]]" = OrderedDict()
+
+    def start(self, search: Callable[[], SearchResultsWithSummary]) -> str:
+        """Starts a search with a summary and returns its token.
+
+        Args:
+            search: Runs the search, including the summary.
+
+        Returns:
+            The token to redeem the summary with.
+        """
+        token = uuid4().hex
+        future = self._executor.submit(search)
+        with self._lock:
+            self._expire()
+            self._pending[token] = (future, monotonic() + self.ttl_seconds)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[Future]:
+        """Returns the future of a token, or None if it's unknown or
+        expired. The future resolves to a SearchResultsWithSummary."""
+        with self._lock:
+            self._expire()
+            pending = self._pending.get(token)
+        return pending[0] if pending else None
+
+    def _expire(self):
+        now = monotonic()
+        while self._pending:
+            token, (_, expires_at) = next(iter(self._pending.items()))
+            if expires_at > now:
+                break
+            del self._pending[token]
+
+
+PENDING_SUMMARIES = PendingSummaries()
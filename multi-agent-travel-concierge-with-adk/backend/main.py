@@ -13,11 +13,15 @@
 # limitations under the License.
 
 import sys
+from asyncio import create_task, to_thread
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from src.controller.chats import router as chat_router
 from src.controller.intents import router as intent_router
 from src.controller.models import router as model_router
+from src.service.chat_log import CHAT_LOG_WRITER
+from src.service.intent_registry import INTENT_REGISTRY
 from google.cloud import speech
 from os import getenv
 import logging
@@ -25,7 +29,17 @@ import logging
 logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 logging.info("Test message")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await to_thread(INTENT_REGISTRY.refresh)
+    intent_poller = create_task(INTENT_REGISTRY.poll())
+    yield
+    intent_poller.cancel()
+    await to_thread(CHAT_LOG_WRITER.close)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 def configure_cors(app):
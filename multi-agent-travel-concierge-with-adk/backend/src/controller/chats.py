@@ -17,7 +17,6 @@ import json
 import logging
 
 from fastapi import APIRouter
-from fastapi import BackgroundTasks
 from fastapi import Response  # This import is no longer needed if POST is removed
 from fastapi import WebSocket
 from starlette.websockets import WebSocketDisconnect
@@ -26,7 +25,7 @@ from vertexai import agent_engines
 from src.model.chats import Chat
 from src.model.chats import CreateChatRequest
 from src.service.chats import ChatsService
-from src.service.intent import IntentService
+from src.service.intent_registry import INTENT_REGISTRY
 from src.service.intent_matching import IntentMatchingService
 
 DEFAULT_USER_ID = "traveler0115"
@@ -43,7 +42,6 @@ router = APIRouter(
 async def websocket_chat(
     *,
     websocket: WebSocket,
-    background_tasks: BackgroundTasks,
 ):
     await websocket.accept()
     # Create a new session for this WebSocket connection
@@ -106,6 +104,7 @@ async def websocket_chat(
 
             print(f"Processing message: '{current_message_text}' for session: {active_session_id}")
             logging.info(f"Processing message: '{current_message_text}' for session: {active_session_id}")
+            answer_parts = []
             for event in remote_agent.stream_query(
                 user_id=DEFAULT_USER_ID,
                 session_id=active_session_id,  # Use the session created for this connection
@@ -117,14 +116,20 @@ async def websocket_chat(
                         # Send only the answer part, no session ID needed by client here
                         answer_part = {"answer": part}
                         await websocket.send_json(answer_part)
-                        log_response(
-                            background_tasks,
-                            intent,
-                            current_message_text,
-                            json.dumps(part),  # Log the streamed part
-                            agent_session,  # Pass the created agent_session object
-                            [],  # Suggested questions for this part
-                        )
+                        # Function calls and responses carry no answer text
+                        if isinstance(part, dict) and part.get("text"):
+                            answer_parts.append(part["text"])
+
+            # Log the whole turn as a single chat, off the event loop as the
+            # chat log writer blocks while its buffer is full
+            await asyncio.to_thread(
+                log_response,
+                intent,
+                current_message_text,
+                "".join(answer_parts),  # Log the answer text of the turn
+                agent_session,  # Pass the created agent_session object
+                [],  # Suggested questions for this turn
+            )
 
             # After streaming all parts for the current message's response
             # Signal end of turn, no session ID needed by client here
@@ -157,7 +162,6 @@ async def websocket_chat(
 
 # The log_response and get_default_intent functions are still used by the websocket_chat endpoint.
 def log_response(
-    background_tasks,
     intent,
     message,
     model_response_content,
@@ -171,15 +175,12 @@ def log_response(
         intent=intent.name,
         suggested_questions=suggested_questions,
     )
-    background_tasks.add_task(
-        ChatsService().insert_chat,
-        final_response,
-    )
+    ChatsService().insert_chat(final_response)
     return final_response
 
 
 def get_default_intent():
-    intents = IntentService().get_all()
+    intents = INTENT_REGISTRY.get_all()
     intent_matching_service = IntentMatchingService(intents)
     intent = intent_matching_service.get_intent_from_query("")
     return intent
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 from uuid import uuid4
 from fastapi import APIRouter, HTTPException
 from src.model.http_status import BadRequest
@@ -21,6 +22,7 @@ from src.repository.big_query import EMBEDDINGS_TABLE, BigQueryRepository, EMBED
 from src.repository.task import TaskRepository
 from src.service.index_endpoint import IndexEndpointService
 from src.service.intent import IntentService
+from src.service.intent_registry import INTENT_REGISTRY
 
 router = APIRouter(
     prefix="/api/intents",
@@ -30,7 +32,8 @@ router = APIRouter(
 @router.get("")
 async def get_intents():
     service = IntentService()
-    intents = service.get_all()
+    intents = INTENT_REGISTRY.get_all()
+    updated = False
 
     for intent in intents:
         if not intent.is_active():
@@ -38,7 +41,10 @@ async def get_intents():
             if index_endpoint_service.endpoint_has_deployed_indexes(intent.get_standard_name()):
                 intent.status = "5"
                 service.update(intent.name, intent)
+                updated = True
 
+    if updated:
+        await asyncio.to_thread(INTENT_REGISTRY.refresh)
     return intents
 
 @router.post("")
@@ -67,7 +73,8 @@ async def create_intent(intent: CreateIntentRequest):
             intent_service.delete(saved_intent.name)
         if index_endpoint:
             index_endpoint_service.delete_endpoint(index_endpoint)
-        
+
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
     return saved_intent
 
 @router.delete("/{intent_name}")
@@ -79,9 +86,11 @@ async def delete_intent(intent_name: str):
         endpoint = index_endpoint_service.get_endpoint(intent.get_standard_name())
         index_endpoint_service.delete_endpoint(endpoint)
     service.delete(intent_name)
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
     return
 
 @router.put("/{intent_name}")
 async def update_intent(intent_name: str, intent: Intent):
     service = IntentService()
-    return service.update(intent_name, intent)
\ No newline at end of file
+    service.update(intent_name, intent)
+    await asyncio.to_thread(INTENT_REGISTRY.refresh)
\ No newline at end of file
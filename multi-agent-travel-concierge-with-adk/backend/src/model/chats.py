@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime, timezone
 from google.cloud.bigquery import SchemaField
 from pydantic import BaseModel
 from typing import List, Optional
@@ -45,6 +46,12 @@ class Chat(BaseModel):
             "timestamp": self.timestamp,
         }
 
+    def to_row(self):
+        return {
+            **self.to_dict(),
+            "timestamp": self.timestamp or datetime.now(timezone.utc).isoformat(),
+        }
+
     def to_insert_string(self):
         return f'"{self.id}", """{self.question}""", """{self.answer}""", "{self.intent}", {str(self.suggested_questions)}, CURRENT_TIMESTAMP()'
 
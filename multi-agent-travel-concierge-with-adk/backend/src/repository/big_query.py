@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from os import getenv
-from typing import Dict, List
+from typing import Any, Dict, List
 from google.cloud.bigquery import Client
 
 BIG_QUERY_DATASET = getenv("BIG_QUERY_DATASET")
@@ -51,6 +51,10 @@ class BigQueryRepository:
             """
         return self.run_query(query)
     
+    def insert_rows_json(self, table_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Streams the rows with one API call instead of a DML job per row.
+        return self.client.insert_rows_json(f"{BIG_QUERY_DATASET}.{table_id}", rows)
+    
     def delete_multiple_rows_by_id(self, table_id: str, id_column: str, ids: List[str]):
         return self.run_query(
             f"""
@@ -0,0 +1,175 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batched writer of the chat history.
+
+Writing every chat with its own DML INSERT job is slow, counts against
+the DML quotas and is billed per job. ChatLogWriter buffers chats in a
+bounded queue and a background thread streams them to BigQuery with
+insert_rows_json, in batches of up to CHAT_LOG_BATCH_SIZE rows or every
+CHAT_LOG_FLUSH_SECONDS, whichever comes first.
+
+When the queue is full, writers block until the flusher catches up, so a
+slow BigQuery applies back-pressure instead of growing memory without
+bound. Buffered chats are flushed when the writer is closed on shutdown.
+"""
+
+from os import getenv
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Dict, List, Optional
+from src.model.chats import Chat
+from src.repository.big_query import CHATS_TABLE, BigQueryRepository
+
+CHAT_LOG_BATCH_SIZE = int(getenv("CHAT_LOG_BATCH_SIZE", "500"))
+CHAT_LOG_FLUSH_SECONDS = float(getenv("CHAT_LOG_FLUSH_SECONDS", "2"))
+CHAT_LOG_MAX_QUEUED = int(getenv("CHAT_LOG_MAX_QUEUED", "10000"))
+# How long a writer waits on a full queue before dropping its chat.
+CHAT_LOG_PUT_TIMEOUT_SECONDS = float(
+    getenv("CHAT_LOG_PUT_TIMEOUT_SECONDS", "30")
+)
+
+
+class ChatLogWriter:
+    """Buffers chats and writes them to BigQuery in batches.
+
+    Attributes:
+        batch_size: Maximum number of rows per insert_rows_json call.
+        flush_seconds: Maximum time a chat waits in the buffer.
+        max_queued: Capacity of the buffer. Writers block beyond it.
+        put_timeout_seconds: Maximum time a writer blocks on a full
+                             buffer before the chat is dropped.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CHAT_LOG_BATCH_SIZE,
+        flush_seconds: float = CHAT_LOG_FLUSH_SECONDS,
+        max_queued: int = CHAT_LOG_MAX_QUEUED,
+        put_timeout_seconds: float = CHAT_LOG_PUT_TIMEOUT_SECONDS,
+    ):
+        """Initializes an empty writer. The flusher starts on first use."""
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_queued = max_queued
+        self.put_timeout_seconds = put_timeout_seconds
+        self._queue: Queue = Queue(maxsize=max_queued)
+        self._stop = Event()
+        self._lock = Lock()
+        self._flusher: Optional[Thread] = None
+        self._repository: Optional[BigQueryRepository] = None
+        self._written = 0
+        self._failed = 0
+        self._dropped = 0
+        self._flushes = 0
+
+    def write(self, chat: Chat):
+        """Buffers a chat, blocking while the buffer is full.
+
+        Args:
+            chat: The chat to persist.
+        """
+        self._start()
+        row = chat.to_row()
+        if self._stop.is_set():
+            # Closed writers write synchronously, e.g. during shutdown.
+            self._flush([row])
+            return
+        try:
+            self._queue.put(row, timeout=self.put_timeout_seconds)
+        except Full:
+            print(f"Chat log buffer is full, dropping chat {chat.id}")
+            with self._lock:
+                self._dropped += 1
+
+    def close(self, timeout: Optional[float] = None):
+        """Flushes the buffered chats and stops the flusher."""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join(timeout)
+        else:
+            self._drain()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the writer counters."""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "max_queued": self.max_queued,
+                "written": self._written,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "flushes": self._flushes,
+            }
+
+    def _start(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = Thread(
+                    target=self._run, name="chat-log-writer", daemon=True
+                )
+                self._flusher.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush(self._next_batch())
+        self._drain()
+
+    def _drain(self):
+        # Flushes whatever was buffered before close.
+        while not self._queue.empty():
+            self._flush(self._next_batch(wait=False))
+
+    def _next_batch(self, wait: bool = True) -> List[Dict[str, Any]]:
+        """Collects rows until the batch is full or its first row has
+        waited `flush_seconds`."""
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = deadline - monotonic() if deadline else self.flush_seconds
+            try:
+                if wait and timeout > 0 and not self._stop.is_set():
+                    row = self._queue.get(timeout=timeout)
+                else:
+                    row = self._queue.get_nowait()
+            except Empty:
+                break
+            batch.append(row)
+            if deadline is None:
+                deadline = monotonic() + self.flush_seconds
+        return batch
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        if self._repository is None:
+            self._repository = BigQueryRepository()
+        try:
+            errors = self._repository.insert_rows_json(CHATS_TABLE, rows)
+        except Exception as e:
+            print(f"Error writing {len(rows)} chats: {e}")
+            errors = [{"index": index} for index in range(len(rows))]
+        if errors:
+            print(f"Chat log rows rejected by BigQuery: {errors}")
+        failed = len({error.get("index") for error in errors})
+        with self._lock:
+            self._flushes += 1
+            self._written += len(rows) - failed
+            self._failed += failed
+
+
+CHAT_LOG_WRITER = ChatLogWriter()
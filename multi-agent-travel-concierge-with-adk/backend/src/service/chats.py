@@ -12,14 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from src.repository.big_query import BigQueryRepository, CHATS_TABLE, CHATS_ID_COLUMN
 from src.model.chats import Chat
+from src.service.chat_log import CHAT_LOG_WRITER, ChatLogWriter
 
 class ChatsService:
 
-    def __init__(self):
-        self.repository = BigQueryRepository()
+    def __init__(self, writer: ChatLogWriter = CHAT_LOG_WRITER):
+        self.writer = writer
 
     def insert_chat(self, chat: Chat):
-        values = chat.to_insert_string()
-        self.repository.insert_row(CHATS_TABLE, values)
\ No newline at end of file
+        # Queued and written to BigQuery in batches, blocks while full.
+        self.writer.write(chat)
\ No newline at end of file
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from asyncio import sleep, to_thread
+from os import getenv
+from threading import Lock
+from typing import Dict, List, Optional
+from src.model.intent import Intent
+from src.service.intent import IntentService
+
+INTENT_REGISTRY_TTL_SECONDS = int(getenv("INTENT_REGISTRY_TTL_SECONDS", "300"))
+
+
+class IntentRegistry:
+    """In-memory copy of the intents table, so that chat sessions never
+    query BigQuery. Refreshed by the intent endpoints and by a TTL poll."""
+
+    def __init__(self, ttl_seconds: int = INTENT_REGISTRY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._intents: Dict[str, Intent] = {}
+        self._loaded = False
+
+    def get_all(self) -> List[Intent]:
+        if not self._loaded:
+            self.refresh()
+        return [intent.model_copy() for intent in self._intents.values()]
+
+    def get(self, intent_name: str) -> Optional[Intent]:
+        if not self._loaded:
+            self.refresh()
+        intent = self._intents.get(intent_name)
+        return intent.model_copy() if intent else None
+
+    def refresh(self):
+        intents = IntentService().get_all()
+        with self._lock:
+            self._intents = {intent.name: intent for intent in intents}
+            self._loaded = True
+
+    async def poll(self):
+        if self.ttl_seconds <= 0:
+            return
+        while True:
+            await sleep(self.ttl_seconds)
+            try:
+                await to_thread(self.refresh)
+            except Exception as e:
+                logging.error(f"Error refreshing intents: {e}")
+
+
+INTENT_REGISTRY = IntentRegistry()
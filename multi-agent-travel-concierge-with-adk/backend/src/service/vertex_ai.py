@@ -12,11 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from dataclasses import dataclass
 from langchain_google_vertexai import VertexAIEmbeddings
 from vertexai.preview.generative_models import GenerativeModel
 from google.cloud import bigquery
 from google.cloud.aiplatform import MatchingEngineIndexEndpoint, MatchingEngineIndex
-from typing import List, MutableSequence
+from typing import Dict, List, MutableSequence
 from src.model.intent import Intent
 from src.repository.big_query import BIG_QUERY_DATASET, EMBEDDINGS_TABLE
 from google.cloud.aiplatform_v1 import (
@@ -35,8 +36,30 @@ TEXT_EMBEDDING_MODEL = "text-multilingual-embedding-002"
 EMBEDDINGS_MODEL = VertexAIEmbeddings(TEXT_EMBEDDING_MODEL)
 
 INTENTS_HASH = ""
-INDEX_ENDPOINTS = {}
-INDEX_ENDPOINTS_CLIENTS = {}
+
+
+@dataclass(frozen=True)
+class IndexEndpointDescriptor:
+    """Everything needed to query the index deployed on an endpoint.
+
+    Resolved once when the intents change, so a chat turn makes no Vertex
+    AI lookups besides the find_neighbors call.
+
+    Attributes:
+        endpoint: The resource name of the index endpoint.
+        deployed_index_id: The id of the index deployed on the endpoint.
+        index_name: The display name of the deployed index, which is also
+                    the name its chunk texts are stored under in BigQuery.
+        client: A client for the public domain of the endpoint.
+    """
+
+    endpoint: str
+    deployed_index_id: str
+    index_name: str
+    client: MatchServiceClient
+
+
+INDEX_ENDPOINTS: Dict[str, IndexEndpointDescriptor] = {}
 
 
 class VertexAIService:
@@ -54,26 +77,32 @@ class VertexAIService:
                 ixs = MatchingEngineIndexEndpoint.list(
                     filter=f'display_name="{intent.get_standard_name()}"',
                 )
-                if len(ixs) == 0:
+                if len(ixs) == 0 or not ixs[0].deployed_indexes:
                     print(
                         f"Intent {intent.name} is not yet initialized. Please run load_indexes.py to create an index for the intent"
                     )
                     continue
-                INDEX_ENDPOINTS[intent.get_standard_name()] = ixs[0]
-                # Configure Vector Search client
-                INDEX_ENDPOINTS_CLIENTS[intent.get_standard_name()] = (
-                    MatchServiceClient(
-                        client_options={
-                            "api_endpoint": ixs[0].public_endpoint_domain_name,
-                        },
+                deployed_index = ixs[0].deployed_indexes[0]
+                INDEX_ENDPOINTS[intent.get_standard_name()] = (
+                    IndexEndpointDescriptor(
+                        endpoint=ixs[0].resource_name,
+                        deployed_index_id=deployed_index.id,
+                        index_name=MatchingEngineIndex(
+                            deployed_index.index
+                        ).display_name,
+                        # Configure Vector Search client
+                        client=MatchServiceClient(
+                            client_options={
+                                "api_endpoint": ixs[0].public_endpoint_domain_name,
+                            },
+                        ),
                     )
                 )
             INTENTS_HASH = new_hash
 
     def vector_search_query(
         self,
-        index_endpoint: MatchingEngineIndexEndpoint,
-        match_service_client: MatchServiceClient,
+        index_endpoint: IndexEndpointDescriptor,
         question: str,
     ) -> MutableSequence[FindNeighborsResponse.Neighbor]:
         # Build FindNeighborsRequest object
@@ -84,10 +113,10 @@ class VertexAIService:
         query = FindNeighborsRequest.Query(datapoint=datapoint, neighbor_count=3)
 
         return (
-            match_service_client.find_neighbors(
+            index_endpoint.client.find_neighbors(
                 FindNeighborsRequest(
-                    index_endpoint=index_endpoint.resource_name,
-                    deployed_index_id=index_endpoint.deployed_indexes[0].id,
+                    index_endpoint=index_endpoint.endpoint,
+                    deployed_index_id=index_endpoint.deployed_index_id,
                     # Request can have multiple queries
                     queries=[query],
                     return_full_datapoint=False,
@@ -97,11 +126,6 @@ class VertexAIService:
             .neighbors
         )
 
-    def get_index_name(self, index_endpoint: MatchingEngineIndexEndpoint) -> str:
-        return MatchingEngineIndex(
-            index_endpoint.deployed_indexes[0].index
-        ).display_name
-
     def get_text_results_from_bigquery(self, chunk_ids: List[str], index_name: str):
         if not chunk_ids:
             return []
@@ -194,16 +218,14 @@ class VertexAIService:
         model = GenerativeModel(intent.ai_model)
         if intent.gcp_bucket:
             index_endpoint = INDEX_ENDPOINTS[intent.get_standard_name()]
-            match_engine_client = INDEX_ENDPOINTS_CLIENTS[intent.get_standard_name()]
             similarity_results = self.vector_search_query(
                 index_endpoint,
-                match_engine_client,
                 query,
             )
             if similarity_results:
                 context = self.get_text_results_from_bigquery(
                     [res.datapoint.datapoint_id for res in similarity_results],
-                    self.get_index_name(index_endpoint),
+                    index_endpoint.index_name,
                 )
                 return self.generate_llm_response(
                     model,